@@ -1,16 +1,34 @@
+import argparse
+import base64
+import bisect
+import hashlib
 import json
+import multiprocessing
 import os
 import uuid
 import secrets
+import sqlite3
+import threading
 import zipfile
 import time
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, as_completed
+from concurrent.futures.process import BrokenProcessPool
+from contextlib import contextmanager
 from datetime import datetime
+from functools import partial
 from io import BytesIO
 
-from flask import Flask, jsonify, redirect, render_template, request, send_from_directory, send_file, session, url_for
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+
+from flask import Flask, Response, g, has_request_context, jsonify, redirect, render_template, request, send_from_directory, send_file, session, url_for
 from werkzeug.security import check_password_hash, generate_password_hash
+from werkzeug.utils import safe_join
 from fpdf import FPDF
-from PIL import Image
+from PIL import Image, ImageOps
 import cv2
 import numpy as np
 
@@ -18,21 +36,280 @@ import numpy as np
 BASE_DIR = os.path.dirname(os.path.abspath(__file__))
 UPLOAD_DIR = os.path.join(BASE_DIR, "uploads")
 DB_DIR = os.path.join(BASE_DIR, "database")
+DB_INDEX_DIR = os.path.join(BASE_DIR, "database_faces")
 EVENTS_DIR = os.path.join(BASE_DIR, "events")
 EVENTS_FILE = os.path.join(EVENTS_DIR, "events.json")
 PHOTOGRAPHERS_FILE = os.path.join(EVENTS_DIR, "photographers.json")
+REGISTRY_VERSION_FILE = os.path.join(EVENTS_DIR, "registry.version")
+DATABASE_FILE = os.environ.get("DATABASE_FILE", os.path.join(EVENTS_DIR, "scnr.sqlite3"))
+DATABASE_SCHEMA = """
+CREATE TABLE IF NOT EXISTS meta (
+    key TEXT PRIMARY KEY,
+    value TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS photographers (
+    id TEXT PRIMARY KEY,
+    client_name TEXT NOT NULL,
+    username TEXT NOT NULL,
+    password_hash TEXT NOT NULL
+);
+CREATE UNIQUE INDEX IF NOT EXISTS photographers_username
+    ON photographers (username COLLATE NOCASE);
+CREATE TABLE IF NOT EXISTS events (
+    id TEXT PRIMARY KEY,
+    photographer_id TEXT NOT NULL REFERENCES photographers (id),
+    name TEXT NOT NULL,
+    code TEXT NOT NULL,
+    index_version INTEGER NOT NULL DEFAULT 0
+);
+CREATE INDEX IF NOT EXISTS events_photographer ON events (photographer_id);
+CREATE TABLE IF NOT EXISTS folders (
+    event_id TEXT NOT NULL REFERENCES events (id),
+    legacy INTEGER NOT NULL DEFAULT 0,
+    name TEXT NOT NULL,
+    scanned_mtime INTEGER,
+    PRIMARY KEY (event_id, legacy, name)
+);
+CREATE TABLE IF NOT EXISTS photos (
+    event_id TEXT NOT NULL,
+    legacy INTEGER NOT NULL DEFAULT 0,
+    folder TEXT NOT NULL,
+    filename TEXT NOT NULL,
+    size INTEGER,
+    mtime REAL,
+    width INTEGER,
+    height INTEGER,
+    sha256 TEXT,
+    PRIMARY KEY (event_id, legacy, folder, filename),
+    FOREIGN KEY (event_id, legacy, folder) REFERENCES folders (event_id, legacy, name)
+);
+CREATE INDEX IF NOT EXISTS photos_event_order
+    ON photos (event_id, filename COLLATE NOCASE, filename, legacy DESC, folder);
+CREATE INDEX IF NOT EXISTS photos_sha256 ON photos (event_id, sha256);
+"""
+DB_LOCAL = threading.local()
+EVENT_REGISTRY = {"version": None, "events": {}}
+EVENT_REGISTRY_LOCK = threading.Lock()
 ALLOWED_EXTENSIONS = {".jpg", ".jpeg", ".png"}
 ZIP_EXTENSIONS = {".zip"}
-MATCH_CACHE = {}
+MATCH_CACHE = None
 MATCH_CACHE_TTL = 60 * 30
+MATCH_CACHE_SIZE = int(os.environ.get("MATCH_CACHE_SIZE", "4096"))
+MATCH_CACHE_BYTES = int(os.environ.get("MATCH_CACHE_BYTES", str(256 * 1024 * 1024)))
+MATCH_CACHE_TOUCH_INTERVAL = 60
+MATCH_CACHE_URL = os.environ.get("MATCH_CACHE_URL", "")
+MATCH_CACHE_FILE = os.path.join(EVENTS_DIR, "match_cache.sqlite3")
+MATCH_CACHE_LOCK = threading.Lock()
+FACE_ENCODING_SIZE = 100 * 100
+PHOTO_PAGE_MAX = 500
+THUMBNAIL_SIZES = (320, 1280)
+THUMBNAIL_INGEST_SIZES = (320,)
+THUMBNAIL_QUALITY = 82
+ZIP_STREAM_CHUNK_SIZE = 256 * 1024
+UPLOAD_CHUNK_SIZE = 1024 * 1024
+ALBUM_THUMBNAIL_SIZE = 320
+THUMBNAIL_WORKERS = int(os.environ.get("THUMBNAIL_WORKERS", "0")) or min(8, (os.cpu_count() or 1) + 2)
+THUMBNAIL_POOL = None
+THUMBNAIL_LOCK = threading.Lock()
+MATCH_TOP_K = int(os.environ.get("MATCH_TOP_K", "0"))
+MATCH_BATCH_MAX_FACES = int(os.environ.get("MATCH_BATCH_MAX_FACES", "8"))
+MATCH_BATCH_TOP_K = int(os.environ.get("MATCH_BATCH_TOP_K", "100"))
+MATCH_TOGETHER_MAX_DISTANCE = float(os.environ.get("MATCH_TOGETHER_MAX_DISTANCE", "15.0"))
+MATCH_STREAM_CHUNK = int(os.environ.get("MATCH_STREAM_CHUNK", "2000"))
+MATCH_STREAM_PREVIEW = int(os.environ.get("MATCH_STREAM_PREVIEW", "24"))
+FACE_STORE_MAGIC = b"SCNRFACE"
+FACE_STORE_VERSION = 1
+FACE_STORE_ALIGN = 4096
+FACE_STORE_HEADER = np.dtype(
+    [
+        ("magic", "S8"),
+        ("version", "<u4"),
+        ("dim", "<u4"),
+        ("records", "<u8"),
+        ("faces", "<u8"),
+        ("records_offset", "<u8"),
+        ("norms_offset", "<u8"),
+        ("vectors_offset", "<u8"),
+    ]
+)
+FACE_STORE_RECORD = np.dtype(
+    [
+        ("legacy", "u1"),
+        ("folder", "S255"),
+        ("filename", "S255"),
+        ("face", "<i4"),
+        ("indexed_at", "<f8"),
+    ]
+)
+FACE_STORE_CACHE = {}
+FACE_STORE_LOCK = threading.Lock()
+FACE_STORE_POOL = None
+FACE_STORE_TASKS = set()
+FACE_STORE_TASK_LOCK = threading.Lock()
+FACE_STORE_RANGE_GAP = 64
+FACE_STORE_COMPACT_PENDING = int(os.environ.get("FACE_STORE_COMPACT_PENDING", "256"))
+ANN_SEARCH = os.environ.get("ANN_SEARCH", "0") == "1"
+ANN_MIN_FACES = int(os.environ.get("ANN_MIN_FACES", "20000"))
+ANN_NPROBE = int(os.environ.get("ANN_NPROBE", "8"))
+ANN_TRAIN_ROWS = int(os.environ.get("ANN_TRAIN_ROWS", "4096"))
+ANN_KMEANS_ITERATIONS = 10
+COMPACT_SEARCH = os.environ.get("COMPACT_SEARCH", "1") == "1"
+COMPACT_MIN_FACES = int(os.environ.get("COMPACT_MIN_FACES", "5000"))
+COMPACT_DIMS = int(os.environ.get("COMPACT_DIMS", "128"))
+COMPACT_RERANK = int(os.environ.get("COMPACT_RERANK", "256"))
+COMPACT_TRAIN_ROWS = int(os.environ.get("COMPACT_TRAIN_ROWS", "4096"))
+DERIVED_INDEX_CACHE = {}
+INGEST_WORKERS = int(os.environ.get("INGEST_WORKERS", "0")) or None
+INGEST_JOB_SAVE_INTERVAL = 1.0
+INGEST_POOL = None
+INGEST_JOBS = {}
+INGEST_LOCK = threading.Lock()
 FACE_CASCADE = cv2.CascadeClassifier(
     os.path.join(cv2.data.haarcascades, "haarcascade_frontalface_default.xml")
 )
+FACE_CASCADE_WINDOW = 24
+FACE_MIN_SIZE = 60
+FACE_CROP_SIZE = 100
+FACE_DETECT_MIN_SIDE = int(os.environ.get("FACE_DETECT_MIN_SIDE", "1280"))
+FACE_DETECT_FLAGS = {
+    2: cv2.IMREAD_REDUCED_GRAYSCALE_2,
+    4: cv2.IMREAD_REDUCED_GRAYSCALE_4,
+    8: cv2.IMREAD_REDUCED_GRAYSCALE_8,
+}
+METRICS_ENABLED = os.environ.get("METRICS_ENABLED", "0") == "1"
+SERVER_TIMING = os.environ.get("SERVER_TIMING", "0") == "1"
+METRICS_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+METRICS_TOKEN = os.environ.get("METRICS_TOKEN", "")
 
 app = Flask(__name__, static_folder="static", template_folder="templates")
 app.secret_key = os.environ.get("SECRET_KEY", "change_me")
 
 
+class _Metrics:
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self.lock = threading.Lock()
+        self.counters = {}
+        self.stages = {}
+        self.requests = {}
+
+    def count(self, name, value):
+        with self.lock:
+            self.counters[name] = self.counters.get(name, 0) + value
+
+    def observe_stage(self, stage, seconds):
+        with self.lock:
+            total, count = self.stages.get(stage, (0.0, 0))
+            self.stages[stage] = (total + seconds, count + 1)
+
+    def observe_request(self, route, method, status, seconds):
+        with self.lock:
+            histogram = self.requests.get((route, method, status))
+            if histogram is None:
+                histogram = self.requests[(route, method, status)] = [[0] * len(self.buckets), 0.0, 0]
+            index = bisect.bisect_left(self.buckets, seconds)
+            if index < len(self.buckets):
+                histogram[0][index] += 1
+            histogram[1] += seconds
+            histogram[2] += 1
+
+    def render(self):
+        with self.lock:
+            counters = sorted(self.counters.items())
+            stages = sorted(self.stages.items())
+            requests = sorted((key, (list(value[0]), value[1], value[2])) for key, value in self.requests.items())
+        lines = []
+        for name, value in counters:
+            lines.append(f"# TYPE scnr_{name}_total counter")
+            lines.append(f"scnr_{name}_total {value}")
+        lines.append("# TYPE scnr_stage_duration_seconds summary")
+        for stage, (total, count) in stages:
+            lines.append(f'scnr_stage_duration_seconds_sum{{stage="{stage}"}} {total:.6f}')
+            lines.append(f'scnr_stage_duration_seconds_count{{stage="{stage}"}} {count}')
+        lines.append("# TYPE scnr_http_request_duration_seconds histogram")
+        for (route, method, status), (buckets, total, count) in requests:
+            labels = f'route={json.dumps(route)},method="{method}",status="{status}"'
+            cumulative = 0
+            for bound, observed in zip(self.buckets, buckets):
+                cumulative += observed
+                lines.append(f'scnr_http_request_duration_seconds_bucket{{{labels},le="{bound}"}} {cumulative}')
+            lines.append(f'scnr_http_request_duration_seconds_bucket{{{labels},le="+Inf"}} {count}')
+            lines.append(f"scnr_http_request_duration_seconds_sum{{{labels}}} {total:.6f}")
+            lines.append(f"scnr_http_request_duration_seconds_count{{{labels}}} {count}")
+        return "\n".join(lines) + "\n"
+
+
+METRICS = _Metrics(METRICS_BUCKETS)
+
+
+def _count(name, value=1):
+    if METRICS_ENABLED:
+        METRICS.count(name, value)
+
+
+def _record_stage(stage, seconds):
+    if METRICS_ENABLED:
+        METRICS.observe_stage(stage, seconds)
+    if SERVER_TIMING and has_request_context():
+        timings = g.setdefault("server_timing", {})
+        timings[stage] = timings.get(stage, 0.0) + seconds
+
+
+@contextmanager
+def _timed(stage):
+    if not METRICS_ENABLED and not SERVER_TIMING:
+        yield
+        return
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        _record_stage(stage, time.perf_counter() - started)
+
+
+@app.before_request
+def _start_request_timer():
+    if METRICS_ENABLED or SERVER_TIMING:
+        g.request_started = time.perf_counter()
+
+
+def _observe_streamed_request(route, method, status, started):
+    METRICS.observe_request(route, method, status, time.perf_counter() - started)
+
+
+@app.after_request
+def _finish_request_timer(response):
+    started = g.get("request_started")
+    if started is None:
+        return response
+    elapsed = time.perf_counter() - started
+    if METRICS_ENABLED:
+        route = request.url_rule.rule if request.url_rule else "unmatched"
+        if response.is_streamed:
+            response.call_on_close(
+                partial(_observe_streamed_request, route, request.method, response.status_code, started)
+            )
+        else:
+            METRICS.observe_request(route, request.method, response.status_code, elapsed)
+    if SERVER_TIMING:
+        timings = g.get("server_timing", {})
+        response.headers["Server-Timing"] = ", ".join(
+            [f"{stage};dur={seconds * 1000:.1f}" for stage, seconds in timings.items()]
+            + [f"total;dur={elapsed * 1000:.1f}"]
+        )
+    return response
+
+
+@app.route("/metrics")
+def metrics():
+    if not METRICS_ENABLED:
+        return jsonify(error="Metrics are disabled."), 404
+    supplied = request.headers.get("Authorization", "").removeprefix("Bearer ")
+    if not METRICS_TOKEN or not secrets.compare_digest(supplied.encode("utf-8"), METRICS_TOKEN.encode("utf-8")):
+        return jsonify(error="Invalid metrics token."), 403
+    return Response(METRICS.render(), mimetype="text/plain; version=0.0.4")
+
+
 def _is_allowed(filename):
     _, ext = os.path.splitext(filename)
     return ext.lower() in ALLOWED_EXTENSIONS
@@ -56,26 +333,120 @@ def _safe_zip_members(members):
     return safe
 
 
+def _face_detect_scale(image_path):
+    if FACE_DETECT_MIN_SIDE <= 0:
+        return 1
+    try:
+        with Image.open(image_path) as image:
+            longest = max(image.size)
+    except (OSError, ValueError, Image.DecompressionBombError):
+        return 1
+    for scale in (8, 4, 2):
+        if longest // scale >= FACE_DETECT_MIN_SIDE:
+            return scale
+    return 1
+
+
+def _read_face_gray(image_path, scale):
+    if scale > 1:
+        return cv2.imread(image_path, FACE_DETECT_FLAGS[scale])
+    image = cv2.imread(image_path)
+    if image is None:
+        return None
+    return cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
+
+
 def _load_face_encodings(image_path):
     if FACE_CASCADE.empty():
         return []
-    image = cv2.imread(image_path)
-    if image is None:
+    with _timed("decode"):
+        scale = _face_detect_scale(image_path)
+        gray = _read_face_gray(image_path, scale)
+    if gray is None:
         return []
-    gray = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
-    faces = FACE_CASCADE.detectMultiScale(
-        gray, scaleFactor=1.1, minNeighbors=5, minSize=(60, 60)
-    )
+    min_size = max(FACE_CASCADE_WINDOW, -(-FACE_MIN_SIZE // scale))
+    with _timed("detect"):
+        faces = FACE_CASCADE.detectMultiScale(
+            gray, scaleFactor=1.1, minNeighbors=5, minSize=(min_size, min_size)
+        )
+    _count("faces_found", len(faces))
+    if len(faces) == 0:
+        return []
+    boxes = np.asarray(faces, dtype=np.int64) * scale
+    crop_scale = scale
+    while crop_scale > 1 and int(boxes[:, 2:].min()) < FACE_CROP_SIZE * crop_scale:
+        crop_scale //= 2
+    source = gray
+    if crop_scale != scale:
+        source = _read_face_gray(image_path, crop_scale)
+        if source is None:
+            source, crop_scale = gray, scale
     encodings = []
-    for (x, y, w, h) in faces:
-        face = gray[y : y + h, x : x + w]
-        resized = cv2.resize(face, (100, 100), interpolation=cv2.INTER_AREA)
+    for (x, y, w, h) in boxes // crop_scale:
+        face = source[y : y + h, x : x + w]
+        if face.size == 0:
+            continue
+        resized = cv2.resize(face, (FACE_CROP_SIZE, FACE_CROP_SIZE), interpolation=cv2.INTER_AREA)
         encodings.append(resized.flatten().astype("float32") / 255.0)
     return encodings
 
 
-def _face_distance(encoding_a, encoding_b):
-    return float(np.linalg.norm(encoding_a - encoding_b))
+def _stack_face_encodings(encoding_lists):
+    counts = np.fromiter((len(item) for item in encoding_lists), dtype=np.int64, count=len(encoding_lists))
+    matrix = np.empty((int(counts.sum()), FACE_ENCODING_SIZE), dtype=np.float32)
+    row = 0
+    for encodings in encoding_lists:
+        for encoding in encodings:
+            matrix[row] = encoding
+            row += 1
+    offsets = np.zeros(len(counts), dtype=np.int64)
+    np.cumsum(counts[:-1], out=offsets[1:])
+    return matrix, offsets
+
+
+def _squared_norms(matrix, chunk_rows=4096):
+    norms = np.empty(len(matrix), dtype=np.float64)
+    for start in range(0, len(matrix), chunk_rows):
+        block = matrix[start : start + chunk_rows]
+        norms[start : start + len(block)] = np.einsum("ij,ij->i", block, block, dtype=np.float64)
+    return norms
+
+
+def _face_distances(gallery, query, gallery_norms=None):
+    query = np.asarray(query, dtype=np.float32)
+    distances = _squared_norms(gallery) if gallery_norms is None else gallery_norms.copy()
+    if query.ndim == 2:
+        distances = distances[:, None] - 2.0 * (gallery @ query.T)
+        distances += np.einsum("ij,ij->i", query, query, dtype=np.float64)
+    else:
+        distances -= 2.0 * (gallery @ query)
+        distances += float(np.einsum("i,i->", query, query, dtype=np.float64))
+    np.maximum(distances, 0.0, out=distances)
+    return np.sqrt(distances, out=distances)
+
+
+def _photo_min_distances(vectors, rows, face_distances, offsets, query, chunk_rows=1024):
+    minima = np.minimum.reduceat(face_distances, offsets)
+    counts = np.diff(np.append(offsets, len(face_distances)))
+    positions = np.arange(len(face_distances)).reshape(-1, *([1] * (face_distances.ndim - 1)))
+    hits = np.where(face_distances == np.repeat(minima, counts, axis=0), positions, len(face_distances))
+    best = rows[np.minimum.reduceat(hits, offsets)].reshape(len(minima), -1)
+    exact = minima.reshape(len(minima), -1)
+    for column, vector in enumerate(np.atleast_2d(np.asarray(query, dtype=np.float32))):
+        finite = np.flatnonzero(np.isfinite(exact[:, column]))
+        for start in range(0, len(finite), chunk_rows):
+            picked = finite[start : start + chunk_rows]
+            difference = vectors[best[picked, column]] - vector
+            exact[picked, column] = np.sqrt(difference[:, None, :] @ difference[:, :, None])[:, 0, 0]
+    return minima
+
+
+def _top_k_indices(scores, k=0):
+    if k and k < len(scores):
+        candidates = np.argpartition(scores, k - 1)[:k]
+    else:
+        candidates = np.arange(len(scores))
+    return candidates[np.argsort(scores[candidates], kind="stable")]
 
 
 def _ensure_dir(path):
@@ -104,66 +475,184 @@ def _events_file(photographer_id):
     return os.path.join(_photographer_dir(photographer_id), "events.json")
 
 
-def _load_events_for(photographer_id):
-    _ensure_dir(_photographer_dir(photographer_id))
-    path = _events_file(photographer_id)
+def _db():
+    conn = getattr(DB_LOCAL, "conn", None)
+    if conn is not None and DB_LOCAL.pid == os.getpid():
+        return conn
+    _ensure_dir(os.path.dirname(DATABASE_FILE))
+    conn = sqlite3.connect(DATABASE_FILE, timeout=30, isolation_level=None)
+    conn.row_factory = sqlite3.Row
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=NORMAL")
+    conn.execute("PRAGMA foreign_keys=ON")
+    try:
+        conn.executescript(DATABASE_SCHEMA)
+        _migrate_json_metadata(conn)
+    except BaseException:
+        conn.close()
+        raise
+    DB_LOCAL.conn = conn
+    DB_LOCAL.pid = os.getpid()
+    return conn
+
+
+@contextmanager
+def _db_transaction():
+    conn = _db()
+    conn.execute("BEGIN IMMEDIATE")
+    try:
+        yield conn
+    except BaseException:
+        conn.execute("ROLLBACK")
+        raise
+    conn.execute("COMMIT")
+
+
+def _read_json_file(path):
     if not os.path.exists(path):
         return []
     with open(path, "r", encoding="utf-8") as handle:
         return json.load(handle)
 
 
-def _save_events_for(photographer_id, events):
-    _ensure_dir(_photographer_dir(photographer_id))
-    with open(_events_file(photographer_id), "w", encoding="utf-8") as handle:
-        json.dump(events, handle, indent=2)
+def _migrate_json_metadata(conn):
+    if conn.execute("SELECT 1 FROM meta WHERE key = 'json_migrated'").fetchone():
+        return
+    conn.execute("BEGIN IMMEDIATE")
+    try:
+        if not conn.execute("SELECT 1 FROM meta WHERE key = 'json_migrated'").fetchone():
+            for photographer in _read_json_file(PHOTOGRAPHERS_FILE):
+                conn.execute(
+                    "INSERT OR IGNORE INTO photographers (id, client_name, username, password_hash) "
+                    "VALUES (:id, :client_name, :username, :password_hash)",
+                    photographer,
+                )
+                for event in _read_json_file(_events_file(photographer["id"])):
+                    conn.execute(
+                        "INSERT OR IGNORE INTO events (id, photographer_id, name, code) VALUES (?, ?, ?, ?)",
+                        (event["id"], photographer["id"], event["name"], event["code"]),
+                    )
+            conn.execute("INSERT INTO meta (key, value) VALUES ('json_migrated', ?)", (str(time.time()),))
+    except BaseException:
+        conn.execute("ROLLBACK")
+        raise
+    conn.execute("COMMIT")
 
 
-def _load_photographers():
-    _ensure_dir(EVENTS_DIR)
-    if not os.path.exists(PHOTOGRAPHERS_FILE):
-        return []
-    with open(PHOTOGRAPHERS_FILE, "r", encoding="utf-8") as handle:
-        return json.load(handle)
+def _event_row(row):
+    return {"id": row["id"], "name": row["name"], "code": row["code"]}
 
 
-def _save_photographers(photographers):
-    _ensure_dir(EVENTS_DIR)
-    with open(PHOTOGRAPHERS_FILE, "w", encoding="utf-8") as handle:
-        json.dump(photographers, handle, indent=2)
+def _load_events_for(photographer_id):
+    rows = _db().execute(
+        "SELECT id, name, code FROM events WHERE photographer_id = ? ORDER BY rowid",
+        (photographer_id,),
+    )
+    return [_event_row(row) for row in rows]
+
+
+def _insert_event(photographer_id, event):
+    with _db_transaction() as conn:
+        conn.execute(
+            "INSERT INTO events (id, photographer_id, name, code) VALUES (?, ?, ?, ?)",
+            (event["id"], photographer_id, event["name"], event["code"]),
+        )
+
+
+def _rename_event(photographer_id, event_id, name):
+    with _db_transaction() as conn:
+        cursor = conn.execute(
+            "UPDATE events SET name = ? WHERE id = ? AND photographer_id = ?",
+            (name, event_id, photographer_id),
+        )
+    if cursor.rowcount > 0:
+        _bump_registry_version()
+        return True
+    return False
+
+
+def _insert_photographer(photographer):
+    try:
+        with _db_transaction() as conn:
+            conn.execute(
+                "INSERT INTO photographers (id, client_name, username, password_hash) "
+                "VALUES (:id, :client_name, :username, :password_hash)",
+                photographer,
+            )
+    except sqlite3.IntegrityError:
+        return False
+    return True
 
 
 def _find_photographer_by_username(username):
-    photographers = _load_photographers()
-    for photographer in photographers:
-        if photographer["username"].lower() == username.lower():
-            return photographer
-    return None
+    row = _db().execute(
+        "SELECT id, client_name, username, password_hash FROM photographers "
+        "WHERE username = ? COLLATE NOCASE",
+        (username,),
+    ).fetchone()
+    return dict(row) if row else None
 
 
 def _find_photographer_by_id(photographer_id):
-    photographers = _load_photographers()
-    for photographer in photographers:
-        if photographer["id"] == photographer_id:
-            return photographer
-    return None
+    row = _db().execute(
+        "SELECT id, client_name, username, password_hash FROM photographers WHERE id = ?",
+        (photographer_id,),
+    ).fetchone()
+    return dict(row) if row else None
+
+
+def _registry_version():
+    try:
+        stat = os.stat(REGISTRY_VERSION_FILE)
+    except OSError:
+        return None
+    return (stat.st_ino, stat.st_size, stat.st_mtime_ns)
+
+
+def _bump_registry_version():
+    _ensure_dir(EVENTS_DIR)
+    tmp_path = f"{REGISTRY_VERSION_FILE}.{uuid.uuid4().hex}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as handle:
+        handle.write(uuid.uuid4().hex)
+    os.replace(tmp_path, REGISTRY_VERSION_FILE)
+
+
+def _registered_event(event_id):
+    version = _registry_version()
+    with EVENT_REGISTRY_LOCK:
+        if EVENT_REGISTRY["version"] != version:
+            EVENT_REGISTRY["version"] = version
+            EVENT_REGISTRY["events"] = {}
+        cached = EVENT_REGISTRY["events"].get(event_id)
+    if cached:
+        return cached
+    row = _db().execute(
+        "SELECT id, name, code, photographer_id FROM events WHERE id = ?", (event_id,)
+    ).fetchone()
+    if not row:
+        return None, None
+    cached = (_event_row(row), row["photographer_id"])
+    with EVENT_REGISTRY_LOCK:
+        if EVENT_REGISTRY["version"] == version:
+            EVENT_REGISTRY["events"][event_id] = cached
+    return cached
 
 
 def _find_event(event_id, photographer_id=None):
+    with _timed("find_event"):
+        event, owner_id = _registered_event(event_id)
     if photographer_id:
-        events = _load_events_for(photographer_id)
-        for event in events:
-            if event["id"] == event_id:
-                return event
-        return None
+        return event if owner_id == photographer_id else None
+    return event, owner_id
 
-    photographers = _load_photographers()
-    for photographer in photographers:
-        events = _load_events_for(photographer["id"])
-        for event in events:
-            if event["id"] == event_id:
-                return event, photographer["id"]
-    return None, None
+
+def _bump_event_index_version(conn, event_id):
+    conn.execute("UPDATE events SET index_version = index_version + 1 WHERE id = ?", (event_id,))
+
+
+def _event_index_version(event_id):
+    row = _db().execute("SELECT index_version FROM events WHERE id = ?", (event_id,)).fetchone()
+    return row["index_version"] if row else 0
 
 
 def _generate_code():
@@ -187,21 +676,287 @@ def _event_folder_dir(photographer_id, event_id, folder):
     return os.path.join(_event_folder_base(photographer_id, event_id), folder)
 
 
-def _list_event_folders(photographer_id, event_id):
-    folders = set()
+def _hash_file(path):
+    digest = hashlib.sha256()
+    with open(path, "rb") as handle:
+        for chunk in iter(partial(handle.read, UPLOAD_CHUNK_SIZE), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def _hash_photo_job(path):
+    try:
+        return _hash_file(path)
+    except OSError:
+        return None
+
+
+def _save_stream(source, path):
+    digest = hashlib.sha256()
+    with open(path, "wb") as handle:
+        for chunk in iter(partial(source.read, UPLOAD_CHUNK_SIZE), b""):
+            digest.update(chunk)
+            handle.write(chunk)
+    return digest.hexdigest()
+
+
+def _photo_metadata(path, sha256=None):
+    stat = os.stat(path)
+    try:
+        with Image.open(path) as image:
+            width, height = image.size
+    except OSError:
+        width = height = None
+    return stat.st_size, stat.st_mtime, width, height, sha256
+
+
+def _upsert_catalog_photo(conn, event_id, is_legacy, folder, filename, metadata):
+    conn.execute(
+        "INSERT INTO photos (event_id, legacy, folder, filename, size, mtime, width, height, sha256) "
+        "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?) "
+        "ON CONFLICT (event_id, legacy, folder, filename) DO UPDATE SET "
+        "size = excluded.size, mtime = excluded.mtime, width = excluded.width, "
+        "height = excluded.height, sha256 = excluded.sha256",
+        (event_id, int(is_legacy), folder, filename, *metadata),
+    )
+
+
+def _upsert_catalog_folder(conn, event_id, is_legacy, folder, scanned_mtime=None):
+    conn.execute(
+        "INSERT INTO folders (event_id, legacy, name, scanned_mtime) VALUES (?, ?, ?, ?) "
+        "ON CONFLICT (event_id, legacy, name) DO UPDATE SET "
+        "scanned_mtime = COALESCE(excluded.scanned_mtime, folders.scanned_mtime)",
+        (event_id, int(is_legacy), folder, scanned_mtime),
+    )
+
+
+def _event_photo_dirs(photographer_id, event_id):
+    photo_dirs = []
+    legacy_dir = _event_photo_dir(photographer_id, event_id)
+    if os.path.isdir(legacy_dir):
+        photo_dirs.append((True, "default", legacy_dir))
     base = _event_folder_base(photographer_id, event_id)
     if os.path.isdir(base):
-        for entry in os.listdir(base):
-            if os.path.isdir(os.path.join(base, entry)):
-                folders.add(entry)
+        with os.scandir(base) as entries:
+            for entry in entries:
+                if entry.is_dir():
+                    photo_dirs.append((False, entry.name, entry.path))
+    return photo_dirs
+
+
+def _scan_catalog_folder(path, known):
+    added = []
+    seen = set()
+    with os.scandir(path) as entries:
+        for entry in entries:
+            if not entry.is_file() or not _is_allowed(entry.name):
+                continue
+            seen.add(entry.name)
+            stat = entry.stat()
+            if known.get(entry.name) == (stat.st_size, stat.st_mtime):
+                continue
+            try:
+                added.append((entry.name, _photo_metadata(entry.path)))
+            except OSError:
+                seen.discard(entry.name)
+    return added, set(known) - seen
 
-    legacy_dir = _event_photo_dir(photographer_id, event_id)
-    if os.path.isdir(legacy_dir) and any(
-        os.path.splitext(name)[1].lower() in ALLOWED_EXTENSIONS
-        for name in os.listdir(legacy_dir)
-    ):
-        folders.add("default")
 
+def _reconcile_event_catalog(photographer_id, event_id, full=False):
+    conn = _db()
+    known_folders = {
+        (bool(row["legacy"]), row["name"]): row["scanned_mtime"]
+        for row in conn.execute(
+            "SELECT legacy, name, scanned_mtime FROM folders WHERE event_id = ?", (event_id,)
+        )
+    }
+    on_disk = set()
+    stale = []
+    for is_legacy, folder, path in _event_photo_dirs(photographer_id, event_id):
+        try:
+            dir_mtime = os.stat(path).st_mtime_ns
+        except OSError:
+            continue
+        on_disk.add((is_legacy, folder))
+        if full or known_folders.get((is_legacy, folder)) != dir_mtime:
+            stale.append((is_legacy, folder, path, dir_mtime))
+    removed = set(known_folders) - on_disk
+    if not stale and not removed:
+        return set()
+
+    changes = []
+    for is_legacy, folder, path, dir_mtime in stale:
+        known = {
+            row["filename"]: (row["size"], row["mtime"])
+            for row in conn.execute(
+                "SELECT filename, size, mtime FROM photos WHERE event_id = ? AND legacy = ? AND folder = ?",
+                (event_id, int(is_legacy), folder),
+            )
+        }
+        changes.append((is_legacy, folder, dir_mtime, *_scan_catalog_folder(path, known)))
+    changes = [
+        change
+        for change in changes
+        if change[3] or change[4] or known_folders.get((change[0], change[1])) != change[2]
+    ]
+    if not changes and not removed:
+        return set()
+
+    with _db_transaction() as conn:
+        _bump_event_index_version(conn, event_id)
+        for is_legacy, folder in removed:
+            conn.execute(
+                "DELETE FROM photos WHERE event_id = ? AND legacy = ? AND folder = ?",
+                (event_id, int(is_legacy), folder),
+            )
+            conn.execute(
+                "DELETE FROM folders WHERE event_id = ? AND legacy = ? AND name = ?",
+                (event_id, int(is_legacy), folder),
+            )
+        for is_legacy, folder, dir_mtime, added, deleted in changes:
+            _upsert_catalog_folder(conn, event_id, is_legacy, folder, dir_mtime)
+            for filename, metadata in added:
+                _upsert_catalog_photo(conn, event_id, is_legacy, folder, filename, metadata)
+            conn.executemany(
+                "DELETE FROM photos WHERE event_id = ? AND legacy = ? AND folder = ? AND filename = ?",
+                [(event_id, int(is_legacy), folder, filename) for filename in deleted],
+            )
+    return {
+        (is_legacy, folder, filename)
+        for is_legacy, folder, _, added, _ in changes
+        for filename, _ in added
+    }
+
+
+def _catalog_add_photos(photographer_id, event_id, folder, filenames, digests=None):
+    folder_dir = _event_folder_dir(photographer_id, event_id, folder)
+    digests = digests or {}
+    metadata = [
+        (name, _photo_metadata(os.path.join(folder_dir, name), digests.get(name))) for name in filenames
+    ]
+    with _db_transaction() as conn:
+        _bump_event_index_version(conn, event_id)
+        _upsert_catalog_folder(conn, event_id, False, folder, os.stat(folder_dir).st_mtime_ns)
+        for filename, values in metadata:
+            _upsert_catalog_photo(conn, event_id, False, folder, filename, values)
+
+
+def _catalog_condition(event_id, folder=None):
+    if folder is None:
+        return "event_id = ? AND (legacy = 1 OR folder != 'default')", [event_id]
+    return "event_id = ? AND (legacy = 1 OR folder = ?)", [event_id, folder]
+
+
+def _catalog_photos(event_id, folder=None, limit=None, offset=0, after=None):
+    condition, params = _catalog_condition(event_id, folder)
+    if after:
+        condition += (
+            " AND filename COLLATE NOCASE >= ? AND (filename COLLATE NOCASE > ? OR (filename COLLATE NOCASE = ? "
+            "AND (filename > ? OR (filename = ? AND (legacy < ? OR (legacy = ? AND folder > ?))))))"
+        )
+        filename, legacy, folder = after
+        params.extend([filename, filename, filename, filename, filename, legacy, legacy, folder])
+    sql = (
+        "SELECT rowid, legacy, folder, filename, size, mtime, width, height, sha256 FROM photos "
+        f"WHERE {condition} ORDER BY filename COLLATE NOCASE, filename, legacy DESC, folder"
+    )
+    if limit is not None:
+        sql += " LIMIT ? OFFSET ?"
+        params.extend([limit, offset])
+    return _db().execute(sql, params).fetchall()
+
+
+def _count_catalog_photos(event_id, folder=None):
+    condition, params = _catalog_condition(event_id, folder)
+    return _db().execute(f"SELECT COUNT(*) FROM photos WHERE {condition}", params).fetchone()[0]
+
+
+def _encode_photo_cursor(row):
+    payload = json.dumps([row["filename"], row["legacy"], row["folder"]]).encode("utf-8")
+    return base64.urlsafe_b64encode(payload).decode("ascii").rstrip("=")
+
+
+def _decode_photo_cursor(cursor):
+    try:
+        payload = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        filename, legacy, folder = json.loads(payload)
+    except (ValueError, TypeError):
+        return None
+    if not isinstance(filename, str) or not isinstance(folder, str) or legacy not in (0, 1):
+        return None
+    return filename, legacy, folder
+
+
+def _find_catalog_duplicate(event_id, sha256, folder):
+    return _db().execute(
+        "SELECT legacy, folder, filename FROM photos WHERE event_id = ? AND sha256 = ? "
+        "ORDER BY (legacy = 0 AND folder = ?) DESC, legacy, folder, filename LIMIT 1",
+        (event_id, sha256, folder),
+    ).fetchone()
+
+
+def _store_event_upload(photographer_id, event_id, folder, source, filename, stored):
+    photo_dir = _event_folder_dir(photographer_id, event_id, folder)
+    safe_name = _safe_filename(filename)
+    if os.path.exists(os.path.join(photo_dir, safe_name)):
+        base, ext = os.path.splitext(safe_name)
+        safe_name = f"{base}-{uuid.uuid4().hex[:6]}{ext}"
+    target_path = os.path.join(photo_dir, safe_name)
+    tmp_path = f"{target_path}.{uuid.uuid4().hex}.tmp"
+    try:
+        sha256 = _save_stream(source, tmp_path)
+        existing = stored.get(sha256)
+        if existing is None:
+            row = _find_catalog_duplicate(event_id, sha256, folder)
+            if row:
+                existing = (bool(row["legacy"]), row["folder"], row["filename"])
+        if existing and not existing[0] and existing[1] == folder:
+            return _safe_filename(filename), sha256, "duplicate", existing[2]
+        status = "saved"
+        if existing:
+            try:
+                os.link(_event_photo_path(photographer_id, event_id, *existing), target_path)
+                status = "linked"
+            except OSError:
+                pass
+        if status == "saved":
+            os.replace(tmp_path, target_path)
+        stored.setdefault(sha256, (False, folder, safe_name))
+        return safe_name, sha256, status, None
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+
+
+def _dedupe_catalog_photos(photos, store):
+    groups = {}
+    for photo in photos:
+        folder, filename, is_legacy, _, sha256 = photo
+        groups.setdefault(sha256 or (is_legacy, folder, filename), []).append(photo)
+    representatives = []
+    for members in groups.values():
+        chosen = members[0]
+        if store:
+            chosen = next(
+                (member for member in members if (member[2], member[0], member[1]) in store["photos"]),
+                chosen,
+            )
+        representatives.append(chosen[:4])
+    return representatives
+
+
+def _list_event_folders(photographer_id, event_id, reconcile=True):
+    if reconcile:
+        _reconcile_event_catalog(photographer_id, event_id)
+    conn = _db()
+    folders = {
+        row["name"]
+        for row in conn.execute("SELECT name FROM folders WHERE event_id = ? AND legacy = 0", (event_id,))
+    }
+    if conn.execute(
+        "SELECT 1 FROM photos WHERE event_id = ? AND legacy = 1 LIMIT 1", (event_id,)
+    ).fetchone():
+        folders.add("default")
     return sorted(folders, key=lambda name: name.lower())
 
 
@@ -224,6 +979,1158 @@ def _event_upload_dir(photographer_id, event_id):
     return os.path.join(_photographer_dir(photographer_id), event_id, "uploads")
 
 
+def _event_index_dir(photographer_id, event_id):
+    return os.path.join(_photographer_dir(photographer_id), event_id, "faces")
+
+
+def _face_index_path(index_dir, folder, filename, is_legacy=False):
+    if is_legacy:
+        return os.path.join(index_dir, "photos", f"{filename}.npy")
+    return os.path.join(index_dir, "folders", folder, f"{filename}.npy")
+
+
+def _store_face_encodings(index_dir, folder, filename, encodings, is_legacy=False):
+    if not _face_store_key_fits(folder, filename):
+        return
+    path = _face_index_path(index_dir, folder, filename, is_legacy)
+    _ensure_dir(os.path.dirname(path))
+    matrix = np.asarray(encodings, dtype=np.float32).reshape(len(encodings), FACE_ENCODING_SIZE)
+    tmp_path = f"{path}.{uuid.uuid4().hex}.tmp"
+    with open(tmp_path, "wb") as handle:
+        np.save(handle, matrix)
+    os.replace(tmp_path, path)
+
+
+def _indexed_face_encodings(index_dir, folder, filename, image_path, is_legacy=False):
+    path = _face_index_path(index_dir, folder, filename, is_legacy)
+    try:
+        if os.path.getmtime(path) >= os.path.getmtime(image_path):
+            return list(np.load(path))
+    except (OSError, ValueError):
+        pass
+    encodings = _load_face_encodings(image_path)
+    _store_face_encodings(index_dir, folder, filename, encodings, is_legacy)
+    return encodings
+
+
+def _event_thumb_dir(photographer_id, event_id):
+    return os.path.join(_photographer_dir(photographer_id), event_id, "thumbs")
+
+
+def _thumbnail_path(thumb_dir, size, folder, filename, is_legacy=False):
+    if is_legacy:
+        return os.path.join(thumb_dir, str(size), "photos", f"{filename}.jpg")
+    return os.path.join(thumb_dir, str(size), "folders", folder, f"{filename}.jpg")
+
+
+def _render_thumbnail(source_path, thumb_path, size):
+    source_stat = os.stat(source_path)
+    with Image.open(source_path) as image:
+        image.draft("RGB", (size, size))
+        image = ImageOps.exif_transpose(image)
+        width, height = image.size
+        if width > size:
+            image = image.resize(
+                (size, max(1, round(height * size / width))), Image.LANCZOS, reducing_gap=3.0
+            )
+        _ensure_dir(os.path.dirname(thumb_path))
+        tmp_path = f"{thumb_path}.{uuid.uuid4().hex}.tmp"
+        image.convert("RGB").save(tmp_path, format="JPEG", quality=THUMBNAIL_QUALITY)
+    os.utime(tmp_path, ns=(source_stat.st_atime_ns, source_stat.st_mtime_ns))
+    os.replace(tmp_path, thumb_path)
+    return thumb_path
+
+
+def _thumbnail_pool():
+    global THUMBNAIL_POOL
+    with THUMBNAIL_LOCK:
+        if THUMBNAIL_POOL is None:
+            THUMBNAIL_POOL = ThreadPoolExecutor(
+                max_workers=THUMBNAIL_WORKERS, thread_name_prefix="thumbnail"
+            )
+        return THUMBNAIL_POOL
+
+
+def _album_thumbnail(job):
+    if not job:
+        return None
+    source_path, thumb_path = job
+    try:
+        return _ensure_thumbnail(source_path, thumb_path, ALBUM_THUMBNAIL_SIZE)
+    except OSError:
+        return None
+
+
+def _ensure_thumbnail(source_path, thumb_path, size):
+    try:
+        if os.stat(thumb_path).st_mtime_ns == os.stat(source_path).st_mtime_ns:
+            return thumb_path
+    except OSError:
+        pass
+    return _render_thumbnail(source_path, thumb_path, size)
+
+
+def _send_event_thumbnail(photographer_id, event_id, folder, filename, size, is_legacy=False):
+    if size not in THUMBNAIL_SIZES:
+        return jsonify(error="Unsupported thumbnail size."), 400
+    source_dir = (
+        _event_photo_dir(photographer_id, event_id)
+        if is_legacy
+        else _event_folder_dir(photographer_id, event_id, folder)
+    )
+    source_path = safe_join(source_dir, filename)
+    if not source_path or not _is_allowed(source_path) or not os.path.isfile(source_path):
+        return jsonify(error="Photo not found."), 404
+    thumb_path = _thumbnail_path(
+        _event_thumb_dir(photographer_id, event_id), size, folder, filename, is_legacy
+    )
+    try:
+        _ensure_thumbnail(source_path, thumb_path, size)
+    except OSError:
+        return send_file(source_path)
+    return send_file(thumb_path, mimetype="image/jpeg")
+
+
+def _encode_photo_job(image_path, index_dir, folder, filename, is_legacy=False, thumbnails=()):
+    encodings = _load_face_encodings(image_path)
+    _store_face_encodings(index_dir, folder, filename, encodings, is_legacy)
+    for size, thumb_path in thumbnails:
+        try:
+            _ensure_thumbnail(image_path, thumb_path, size)
+        except OSError:
+            pass
+    return len(encodings)
+
+
+def _ingest_context():
+    methods = multiprocessing.get_all_start_methods()
+    return multiprocessing.get_context("forkserver" if "forkserver" in methods else "spawn")
+
+
+def _ingest_pool(reset=False):
+    global INGEST_POOL
+    with INGEST_LOCK:
+        if reset and INGEST_POOL is not None:
+            INGEST_POOL.shutdown(wait=False, cancel_futures=True)
+            INGEST_POOL = None
+        if INGEST_POOL is None:
+            INGEST_POOL = ProcessPoolExecutor(max_workers=INGEST_WORKERS, mp_context=_ingest_context())
+        return INGEST_POOL
+
+
+def _event_jobs_dir(photographer_id, event_id):
+    return os.path.join(_photographer_dir(photographer_id), event_id, "jobs")
+
+
+def _ingest_job_path(photographer_id, event_id, job_id):
+    return os.path.join(_event_jobs_dir(photographer_id, event_id), f"{job_id}.json")
+
+
+def _write_json_atomic(path, data):
+    _ensure_dir(os.path.dirname(path))
+    tmp_path = f"{path}.{uuid.uuid4().hex}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as handle:
+        json.dump(data, handle, indent=2)
+    os.replace(tmp_path, path)
+
+
+def _load_ingest_job(photographer_id, event_id, job_id):
+    if not job_id.isalnum():
+        return None
+    path = _ingest_job_path(photographer_id, event_id, job_id)
+    if not os.path.exists(path):
+        return None
+    with open(path, "r", encoding="utf-8") as handle:
+        return json.load(handle)
+
+
+def _finish_ingest_photo(job_id, future):
+    with INGEST_LOCK:
+        entry = INGEST_JOBS.get(job_id)
+        if not entry:
+            return
+        job = entry["job"]
+        job["queued"] -= 1
+        if future.cancelled() or future.exception() is not None:
+            job["failed"] += 1
+        else:
+            job["encoded"] += 1
+            job["faces"] += future.result()
+        job["updated"] = time.time()
+        snapshot = _ingest_job_snapshot(job_id, entry)
+    try:
+        _save_ingest_job(entry, snapshot)
+    except Exception:
+        app.logger.exception("Failed to save ingest job %s", job_id)
+
+
+def _ingest_job_snapshot(job_id, entry):
+    job = entry["job"]
+    if job["sealed"] and job["queued"] <= 0:
+        job["status"] = "done"
+        INGEST_JOBS.pop(job_id, None)
+    elif job["updated"] - entry["saved"] < INGEST_JOB_SAVE_INTERVAL:
+        return None
+    entry["saved"] = job["updated"]
+    entry["revision"] += 1
+    return entry["revision"], dict(job)
+
+
+def _save_ingest_job(entry, snapshot):
+    if snapshot is None:
+        return
+    revision, job = snapshot
+    with entry["write_lock"]:
+        if revision < entry["written"]:
+            return
+        entry["written"] = revision
+        _write_json_atomic(entry["path"], job)
+    with _db_transaction() as conn:
+        _bump_event_index_version(conn, job["event_id"])
+    if job["status"] == "done":
+        _schedule_event_compaction(entry["photographer_id"], job["event_id"])
+
+
+def _open_ingest_job(photographer_id, event_id, folder):
+    job_id = uuid.uuid4().hex
+    now = time.time()
+    job = {
+        "id": job_id,
+        "event_id": event_id,
+        "folder": folder,
+        "status": "running",
+        "sealed": False,
+        "total": 0,
+        "queued": 0,
+        "encoded": 0,
+        "failed": 0,
+        "faces": 0,
+        "created": now,
+        "updated": now,
+    }
+    path = _ingest_job_path(photographer_id, event_id, job_id)
+    _write_json_atomic(path, job)
+    with INGEST_LOCK:
+        INGEST_JOBS[job_id] = {
+            "job": job,
+            "path": path,
+            "saved": now,
+            "revision": 0,
+            "written": 0,
+            "write_lock": threading.Lock(),
+            "photographer_id": photographer_id,
+        }
+    return job_id
+
+
+def _queue_ingest_photo(job_id, photographer_id, event_id, folder, filename):
+    with INGEST_LOCK:
+        job = INGEST_JOBS[job_id]["job"]
+        job["total"] += 1
+        job["queued"] += 1
+    thumb_dir = _event_thumb_dir(photographer_id, event_id)
+    thumbnails = [
+        (size, _thumbnail_path(thumb_dir, size, folder, filename))
+        for size in THUMBNAIL_INGEST_SIZES
+    ]
+    args = (
+        os.path.join(_event_folder_dir(photographer_id, event_id, folder), filename),
+        _event_index_dir(photographer_id, event_id),
+        folder,
+        filename,
+        False,
+        thumbnails,
+    )
+    try:
+        future = _ingest_pool().submit(_encode_photo_job, *args)
+    except BrokenProcessPool:
+        future = _ingest_pool(reset=True).submit(_encode_photo_job, *args)
+    future.add_done_callback(partial(_finish_ingest_photo, job_id))
+
+
+def _seal_ingest_job(job_id):
+    with INGEST_LOCK:
+        entry = INGEST_JOBS.get(job_id)
+        if not entry:
+            return
+        entry["job"]["sealed"] = True
+        entry["job"]["updated"] = time.time()
+        entry["saved"] = 0.0
+        snapshot = _ingest_job_snapshot(job_id, entry)
+    _save_ingest_job(entry, snapshot)
+
+
+def _iter_upload_images(uploads):
+    for filename, source in uploads:
+        if os.path.splitext(filename)[1].lower() not in ZIP_EXTENSIONS:
+            yield filename, source
+            continue
+        with zipfile.ZipFile(source) as archive:
+            for member in _safe_zip_members(archive.namelist()):
+                with archive.open(member) as src:
+                    yield os.path.basename(member), src
+
+
+def _ingest_event_uploads(photographer_id, event_id, code, folder, uploads):
+    for filename, _ in uploads:
+        if not _is_allowed(filename) and os.path.splitext(filename)[1].lower() not in ZIP_EXTENSIONS:
+            return None, "Only JPG, PNG, or ZIP files are allowed."
+    _ensure_dir(_event_folder_dir(photographer_id, event_id, folder))
+    _reconcile_event_catalog(photographer_id, event_id)
+
+    results = []
+    stored = {}
+    job_id = None
+    error = None
+    saved_files = []
+    duplicates = []
+    digests = {}
+    try:
+        for filename, source in _iter_upload_images(uploads):
+            result = _store_event_upload(photographer_id, event_id, folder, source, filename, stored)
+            results.append(result)
+            if result[2] == "saved":
+                if job_id is None:
+                    job_id = _open_ingest_job(photographer_id, event_id, folder)
+                _queue_ingest_photo(job_id, photographer_id, event_id, folder, result[0])
+    except zipfile.BadZipFile:
+        error = "Invalid ZIP file."
+    finally:
+        for safe_name, sha256, status, duplicate_of in results:
+            if status == "duplicate":
+                duplicates.append({"filename": safe_name, "folder": folder, "duplicate_of": duplicate_of})
+                continue
+            saved_files.append(safe_name)
+            digests[safe_name] = sha256
+        try:
+            if saved_files:
+                _catalog_add_photos(photographer_id, event_id, folder, saved_files, digests)
+        finally:
+            if job_id:
+                _seal_ingest_job(job_id)
+
+    if error:
+        return None, error
+    if not saved_files and not duplicates:
+        return None, "No valid images found in upload."
+    return {
+        "job_id": job_id,
+        "saved_files": saved_files,
+        "image_urls": [
+            f"/events/{event_id}/folders/{folder}/photos/{name}?code={code}" for name in saved_files
+        ],
+        "duplicates": duplicates,
+        "folder": folder,
+    }, None
+
+
+def _event_incoming_dir(photographer_id, event_id):
+    return os.path.join(_photographer_dir(photographer_id), event_id, "incoming")
+
+
+def _upload_session_paths(photographer_id, event_id, upload_id):
+    base = os.path.join(_event_incoming_dir(photographer_id, event_id), upload_id)
+    return f"{base}.json", f"{base}.part"
+
+
+def _load_upload_session(photographer_id, event_id, upload_id):
+    if not upload_id.isalnum():
+        return None
+    meta_path, part_path = _upload_session_paths(photographer_id, event_id, upload_id)
+    if not os.path.exists(meta_path) or not os.path.exists(part_path):
+        return None
+    with open(meta_path, "r", encoding="utf-8") as handle:
+        upload = json.load(handle)
+    upload.update(meta_path=meta_path, part_path=part_path)
+    return upload
+
+
+def _event_photo_path(photographer_id, event_id, is_legacy, folder, filename):
+    if is_legacy:
+        return os.path.join(_event_photo_dir(photographer_id, event_id), filename)
+    return os.path.join(_event_folder_dir(photographer_id, event_id, folder), filename)
+
+
+def _align(offset, alignment):
+    return -(-offset // alignment) * alignment
+
+
+def _face_store_path(index_dir):
+    return os.path.join(index_dir, "store.bin")
+
+
+def _pending_face_entries(index_dir):
+    entries = []
+    for is_legacy, base in (
+        (True, os.path.join(index_dir, "photos")),
+        (False, os.path.join(index_dir, "folders")),
+    ):
+        if not os.path.isdir(base):
+            continue
+        for root, _, files in os.walk(base):
+            folder = "default" if is_legacy else os.path.relpath(root, base)
+            for name in files:
+                if name.endswith(".npy"):
+                    entries.append((is_legacy, folder, name[:-4], os.path.join(root, name)))
+    return entries
+
+
+def _write_face_store(path, photos):
+    with_faces = [photo for photo in photos if len(photo[4])]
+    without_faces = [photo for photo in photos if not len(photo[4])]
+    face_count = sum(len(photo[4]) for photo in with_faces)
+    records = np.zeros(face_count + len(without_faces), dtype=FACE_STORE_RECORD)
+    row = 0
+    for is_legacy, folder, filename, indexed_at, matrix in with_faces + without_faces:
+        count = max(len(matrix), 1)
+        block = records[row : row + count]
+        block["legacy"] = is_legacy
+        block["folder"] = folder.encode("utf-8")
+        block["filename"] = filename.encode("utf-8")
+        block["face"] = np.arange(count) if len(matrix) else -1
+        block["indexed_at"] = indexed_at
+        row += count
+
+    records_offset = _align(FACE_STORE_HEADER.itemsize, 64)
+    norms_offset = _align(records_offset + records.nbytes, 64)
+    vectors_offset = _align(norms_offset + face_count * 8, FACE_STORE_ALIGN)
+    header = np.zeros(1, dtype=FACE_STORE_HEADER)
+    header[0] = (
+        FACE_STORE_MAGIC,
+        FACE_STORE_VERSION,
+        FACE_ENCODING_SIZE,
+        len(records),
+        face_count,
+        records_offset,
+        norms_offset,
+        vectors_offset,
+    )
+
+    tmp_path = f"{path}.{uuid.uuid4().hex}.tmp"
+    with open(tmp_path, "wb") as handle:
+        handle.write(header.tobytes())
+        handle.seek(records_offset)
+        handle.write(records.tobytes())
+        handle.seek(norms_offset)
+        for photo in with_faces:
+            handle.write(_squared_norms(photo[4]).tobytes())
+        handle.seek(vectors_offset)
+        for photo in with_faces:
+            handle.write(np.ascontiguousarray(photo[4], dtype=np.float32).tobytes())
+    os.replace(tmp_path, path)
+
+
+def _open_face_store(path):
+    try:
+        handle = open(path, "rb")
+    except OSError:
+        return None
+    with handle:
+        stat = os.fstat(handle.fileno())
+        identity = (stat.st_ino, stat.st_size, stat.st_mtime_ns)
+        cached = FACE_STORE_CACHE.get(path)
+        if cached and cached["identity"] == identity:
+            return cached
+        store = _read_face_store(handle, stat.st_size)
+    if store is None:
+        return None
+    store["identity"] = identity
+    FACE_STORE_CACHE[path] = store
+    return store
+
+
+def _read_face_store(handle, size):
+    header = np.frombuffer(handle.read(FACE_STORE_HEADER.itemsize), dtype=np.uint8)
+    if len(header) != FACE_STORE_HEADER.itemsize:
+        return None
+    header = header.view(FACE_STORE_HEADER)[0]
+    if (
+        header["magic"] != FACE_STORE_MAGIC
+        or header["version"] != FACE_STORE_VERSION
+        or header["dim"] != FACE_ENCODING_SIZE
+    ):
+        return None
+    face_count = int(header["faces"])
+    record_count = int(header["records"])
+    records_offset = int(header["records_offset"])
+    norms_offset = int(header["norms_offset"])
+    vectors_offset = int(header["vectors_offset"])
+    if (
+        records_offset + record_count * FACE_STORE_RECORD.itemsize > size
+        or norms_offset + face_count * 8 > size
+        or vectors_offset + face_count * FACE_ENCODING_SIZE * 4 > size
+    ):
+        return None
+    handle.seek(records_offset)
+    records = np.frombuffer(handle.read(record_count * FACE_STORE_RECORD.itemsize), dtype=FACE_STORE_RECORD)
+    if len(records) != record_count:
+        return None
+    if face_count:
+        norms = np.memmap(handle, dtype=np.float64, mode="r", offset=norms_offset, shape=(face_count,))
+        vectors = np.memmap(
+            handle,
+            dtype=np.float32,
+            mode="r",
+            offset=vectors_offset,
+            shape=(face_count, FACE_ENCODING_SIZE),
+        )
+    else:
+        norms = np.zeros(0, dtype=np.float64)
+        vectors = np.zeros((0, FACE_ENCODING_SIZE), dtype=np.float32)
+
+    photos = {}
+    starts = np.flatnonzero(records["face"] <= 0)
+    ends = np.append(starts[1:], len(records))
+    for start, end in zip(starts.tolist(), ends.tolist()):
+        record = records[start]
+        is_legacy = bool(record["legacy"])
+        folder = record["folder"].decode("utf-8")
+        filename = record["filename"].decode("utf-8")
+        count = end - start if record["face"] == 0 else 0
+        photos[(is_legacy, folder, filename)] = (start, count, float(record["indexed_at"]))
+
+    return {
+        "norms": norms,
+        "vectors": vectors,
+        "photos": photos,
+    }
+
+
+def _face_store_key_fits(folder, filename):
+    return (
+        len(folder.encode("utf-8")) <= FACE_STORE_RECORD["folder"].itemsize
+        and len(filename.encode("utf-8")) <= FACE_STORE_RECORD["filename"].itemsize
+    )
+
+
+@contextmanager
+def _face_store_lock(index_dir):
+    _ensure_dir(index_dir)
+    with FACE_STORE_LOCK, open(os.path.join(index_dir, "store.lock"), "ab") as handle:
+        if fcntl is not None:
+            fcntl.flock(handle.fileno(), fcntl.LOCK_EX)
+        yield
+
+
+def _compact_face_store(index_dir, photo_path, prune=False):
+    path = _face_store_path(index_dir)
+    with _face_store_lock(index_dir):
+        store = _open_face_store(path)
+        pending = _pending_face_entries(index_dir)
+        if not pending and not (
+            prune and store and not all(os.path.exists(photo_path(*key)) for key in store["photos"])
+        ):
+            return store
+
+        merged = {}
+        if store:
+            for key, (start, count, indexed_at) in store["photos"].items():
+                merged[key] = (indexed_at, store["vectors"][start : start + count])
+        loaded = []
+        for is_legacy, folder, filename, npy_path in pending:
+            try:
+                indexed_at = os.path.getmtime(npy_path)
+                matrix = np.load(npy_path)
+            except (OSError, ValueError):
+                continue
+            merged[(is_legacy, folder, filename)] = (indexed_at, matrix)
+            loaded.append((npy_path, indexed_at))
+
+        photos = sorted(
+            (*key, indexed_at, matrix)
+            for key, (indexed_at, matrix) in merged.items()
+            if os.path.exists(photo_path(*key))
+        )
+        try:
+            _write_face_store(path, photos)
+        except OSError:
+            return store
+        for npy_path, indexed_at in loaded:
+            try:
+                if os.path.getmtime(npy_path) == indexed_at:
+                    os.remove(npy_path)
+            except OSError:
+                pass
+        store = _open_face_store(path)
+        _refresh_derived_indexes(index_dir, store)
+        return store
+
+
+def _run_face_store_task(key, func, *args):
+    with FACE_STORE_TASK_LOCK:
+        FACE_STORE_TASKS.discard(key)
+    try:
+        func(*args)
+    except Exception:
+        app.logger.exception("Face store task %s failed for %s", key[0], key[1])
+
+
+def _schedule_face_store_task(key, func, *args):
+    global FACE_STORE_POOL
+    with FACE_STORE_TASK_LOCK:
+        if key in FACE_STORE_TASKS:
+            return
+        if FACE_STORE_POOL is None:
+            FACE_STORE_POOL = ThreadPoolExecutor(max_workers=1, thread_name_prefix="face-store")
+        FACE_STORE_TASKS.add(key)
+        FACE_STORE_POOL.submit(_run_face_store_task, key, func, *args)
+
+
+def _schedule_event_compaction(photographer_id, event_id):
+    _schedule_face_store_task(
+        ("compact", _event_index_dir(photographer_id, event_id)),
+        _compact_face_store,
+        _event_index_dir(photographer_id, event_id),
+        partial(_event_photo_path, photographer_id, event_id),
+    )
+
+
+def _event_face_store(photographer_id, event_id):
+    return _open_face_store(_face_store_path(_event_index_dir(photographer_id, event_id)))
+
+
+def _database_photo_path(is_legacy, folder, filename):
+    return os.path.join(DB_DIR, filename)
+
+
+def _database_files():
+    _ensure_dir(DB_DIR)
+    with os.scandir(DB_DIR) as entries:
+        return {
+            entry.name: entry.stat().st_mtime
+            for entry in entries
+            if entry.is_file() and _is_allowed(entry.name)
+        }
+
+
+def _database_face_store():
+    store = _open_face_store(_face_store_path(DB_INDEX_DIR))
+    if store is not None or _pending_face_entries(DB_INDEX_DIR):
+        return store
+    files = _database_files()
+    if not files:
+        return None
+    pool = _ingest_pool()
+    futures = [
+        pool.submit(_encode_photo_job, os.path.join(DB_DIR, filename), DB_INDEX_DIR, "default", filename, True)
+        for filename in files
+    ]
+    for future in as_completed(futures):
+        future.exception()
+    return _compact_face_store(DB_INDEX_DIR, _database_photo_path)
+
+
+def _database_indexed_files():
+    store = _open_face_store(_face_store_path(DB_INDEX_DIR))
+    files = {filename for _, _, filename in store["photos"]} if store else set()
+    files.update(filename for _, _, filename, _ in _pending_face_entries(DB_INDEX_DIR))
+    return files
+
+
+def _schedule_database_compaction():
+    if len(_pending_face_entries(DB_INDEX_DIR)) >= FACE_STORE_COMPACT_PENDING:
+        _schedule_face_store_task(
+            ("compact", DB_INDEX_DIR), _compact_face_store, DB_INDEX_DIR, _database_photo_path
+        )
+
+
+def _hash_catalog_photos(event_id, photo_path, pool):
+    rows = _db().execute(
+        "SELECT legacy, folder, filename, mtime FROM photos WHERE event_id = ? AND sha256 IS NULL",
+        (event_id,),
+    ).fetchall()
+    if not rows:
+        return
+    paths = [photo_path(bool(row["legacy"]), row["folder"], row["filename"]) for row in rows]
+    digests = list(pool.map(_hash_photo_job, paths, chunksize=32))
+    with _db_transaction() as conn:
+        _bump_event_index_version(conn, event_id)
+        conn.executemany(
+            "UPDATE photos SET sha256 = ? "
+            "WHERE event_id = ? AND legacy = ? AND folder = ? AND filename = ? AND mtime = ?",
+            [
+                (sha256, event_id, row["legacy"], row["folder"], row["filename"], row["mtime"])
+                for row, sha256 in zip(rows, digests)
+                if sha256
+            ],
+        )
+
+
+def _reindex_event(photographer_id, event_id, pool):
+    started = time.perf_counter()
+    changed = _reconcile_event_catalog(photographer_id, event_id, full=True)
+    index_dir = _event_index_dir(photographer_id, event_id)
+    thumb_dir = _event_thumb_dir(photographer_id, event_id)
+    photo_path = partial(_event_photo_path, photographer_id, event_id)
+    _hash_catalog_photos(event_id, photo_path, pool)
+    previous = _open_face_store(_face_store_path(index_dir))
+    store = _compact_face_store(index_dir, photo_path, prune=True)
+    removed = len(previous["photos"].keys() - store["photos"].keys()) if previous and store else 0
+
+    rows = _db().execute(
+        "SELECT legacy, folder, filename, mtime, sha256 FROM photos WHERE event_id = ? "
+        "ORDER BY legacy DESC, folder, filename",
+        (event_id,),
+    ).fetchall()
+    stale = []
+    seen = set()
+    for row in rows:
+        key = (bool(row["legacy"]), row["folder"], row["filename"])
+        entry = store["photos"].get(key) if store else None
+        if key not in changed and entry is not None and entry[2] >= row["mtime"]:
+            seen.add(row["sha256"] or key)
+        else:
+            stale.append((key, row["sha256"] or key))
+    jobs = []
+    for key, content in stale:
+        if content not in seen:
+            seen.add(content)
+            jobs.append(key)
+
+    futures = []
+    for is_legacy, folder, filename in jobs:
+        thumbnails = [
+            (size, _thumbnail_path(thumb_dir, size, folder, filename, is_legacy))
+            for size in THUMBNAIL_INGEST_SIZES
+        ]
+        futures.append(
+            pool.submit(
+                _encode_photo_job,
+                photo_path(is_legacy, folder, filename),
+                index_dir,
+                folder,
+                filename,
+                is_legacy,
+                thumbnails,
+            )
+        )
+    stats = _collect_encode_results(futures)
+    if futures:
+        _compact_face_store(index_dir, photo_path)
+        with _db_transaction() as conn:
+            _bump_event_index_version(conn, event_id)
+    stats.update(event_id=event_id, photos=len(rows), removed=removed, seconds=time.perf_counter() - started)
+    return stats
+
+
+def _reindex_database(pool):
+    started = time.perf_counter()
+    previous = _open_face_store(_face_store_path(DB_INDEX_DIR))
+    store = _compact_face_store(DB_INDEX_DIR, _database_photo_path, prune=True)
+    removed = len(previous["photos"].keys() - store["photos"].keys()) if previous and store else 0
+    files = _database_files()
+    futures = []
+    for filename, mtime in sorted(files.items()):
+        entry = store["photos"].get((True, "default", filename)) if store else None
+        if entry is None or entry[2] < mtime:
+            futures.append(
+                pool.submit(
+                    _encode_photo_job, os.path.join(DB_DIR, filename), DB_INDEX_DIR, "default", filename, True
+                )
+            )
+    stats = _collect_encode_results(futures)
+    if futures:
+        _compact_face_store(DB_INDEX_DIR, _database_photo_path)
+    stats.update(event_id="database", photos=len(files), removed=removed, seconds=time.perf_counter() - started)
+    return stats
+
+
+def _collect_encode_results(futures):
+    stats = {"encoded": 0, "failed": 0, "faces": 0}
+    for future in as_completed(futures):
+        try:
+            stats["faces"] += future.result()
+            stats["encoded"] += 1
+        except Exception:
+            stats["failed"] += 1
+    return stats
+
+
+def _reindex(event_id=None, workers=None):
+    sql = "SELECT id, photographer_id FROM events"
+    params = ()
+    if event_id:
+        sql += " WHERE id = ?"
+        params = (event_id,)
+    events = _db().execute(sql + " ORDER BY rowid", params).fetchall()
+    if event_id and not events:
+        print(f"Event {event_id} not found.")
+        return 1
+    totals = {"photos": 0, "encoded": 0, "failed": 0, "faces": 0, "removed": 0, "seconds": 0.0}
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        runs = [partial(_reindex_event, event["photographer_id"], event["id"]) for event in events]
+        if not event_id:
+            runs.append(_reindex_database)
+        for run in runs:
+            stats = run(pool)
+            for name in totals:
+                totals[name] += stats[name]
+            rate = stats["encoded"] / stats["seconds"] if stats["seconds"] else 0.0
+            print(
+                f"{stats['event_id']}: {stats['photos']} photos, {stats['encoded']} encoded "
+                f"({stats['faces']} faces, {stats['failed']} failed), {stats['removed']} removed "
+                f"in {stats['seconds']:.1f}s ({rate:.1f} photos/s)"
+            )
+    rate = totals["encoded"] / totals["seconds"] if totals["seconds"] else 0.0
+    print(
+        f"total: {len(runs)} galleries, {totals['photos']} photos, {totals['encoded']} encoded "
+        f"({totals['faces']} faces, {totals['failed']} failed), {totals['removed']} removed "
+        f"in {totals['seconds']:.1f}s ({rate:.1f} photos/s)"
+    )
+    return 1 if totals["failed"] else 0
+
+
+def _nearest_centroids(vectors, centroids, chunk_rows=4096):
+    centroid_norms = _squared_norms(centroids)
+    labels = np.empty(len(vectors), dtype=np.int64)
+    for start in range(0, len(vectors), chunk_rows):
+        block = np.asarray(vectors[start : start + chunk_rows], dtype=np.float32)
+        scores = centroid_norms - 2.0 * (block @ centroids.T)
+        labels[start : start + len(block)] = np.argmin(scores, axis=1)
+    return labels
+
+
+def _kmeans(vectors, clusters, iterations=ANN_KMEANS_ITERATIONS, seed=0):
+    rng = np.random.default_rng(seed)
+    vectors = np.asarray(vectors, dtype=np.float32)
+    centroids = vectors[rng.choice(len(vectors), clusters, replace=False)].copy()
+    for _ in range(iterations):
+        labels = _nearest_centroids(vectors, centroids)
+        order = np.argsort(labels, kind="stable")
+        counts = np.bincount(labels, minlength=clusters)
+        filled = np.flatnonzero(counts)
+        starts = np.concatenate(([0], np.cumsum(counts[filled])[:-1]))
+        sums = np.add.reduceat(vectors[order], starts, axis=0)
+        centroids[filled] = sums / counts[filled, None]
+    return centroids
+
+
+def _build_ivf_index(vectors, seed=0):
+    lists = int(np.clip(np.sqrt(len(vectors)), 1, max(1, ANN_TRAIN_ROWS // 16)))
+    rng = np.random.default_rng(seed)
+    sample = np.sort(rng.choice(len(vectors), min(len(vectors), ANN_TRAIN_ROWS), replace=False))
+    centroids = _kmeans(vectors[sample], lists, seed=seed)
+    labels = _nearest_centroids(vectors, centroids)
+    order = np.argsort(labels, kind="stable")
+    offsets = np.zeros(lists + 1, dtype=np.int64)
+    np.cumsum(np.bincount(labels, minlength=lists), out=offsets[1:])
+    return {"centroids": centroids, "order": order, "offsets": offsets}
+
+
+def _ivf_candidates(ivf, query, nprobe=ANN_NPROBE):
+    centroids = ivf["centroids"]
+    query = np.atleast_2d(np.asarray(query, dtype=np.float32))
+    scores = _squared_norms(centroids)[:, None] - 2.0 * (centroids @ query.T)
+    nprobe = min(max(nprobe, 1), len(centroids))
+    probes = np.unique(np.argpartition(scores, nprobe - 1, axis=0)[:nprobe])
+    offsets = ivf["offsets"]
+    return np.sort(
+        np.concatenate([ivf["order"][offsets[probe] : offsets[probe + 1]] for probe in probes])
+    )
+
+
+def _ivf_index_path(index_dir):
+    return os.path.join(index_dir, "ivf.npz")
+
+
+def _load_derived_index(path, store):
+    identity = np.asarray(store["identity"], dtype=np.int64)
+    cached = DERIVED_INDEX_CACHE.get(path)
+    if cached and np.array_equal(cached["identity"], identity):
+        return cached
+    try:
+        with np.load(path) as data:
+            if not np.array_equal(data["identity"], identity):
+                return None
+            index = {name: data[name] for name in data.files}
+    except (OSError, ValueError, KeyError):
+        return None
+    DERIVED_INDEX_CACHE[path] = index
+    return index
+
+
+def _refresh_derived_indexes(index_dir, store):
+    if not store:
+        return
+    faces = len(store["vectors"])
+    for path, enabled, build in (
+        (_ivf_index_path(index_dir), ANN_SEARCH and faces >= ANN_MIN_FACES, _build_ivf_index),
+        (_compact_index_path(index_dir), COMPACT_SEARCH and faces >= COMPACT_MIN_FACES, _build_compact_index),
+    ):
+        if not enabled or _load_derived_index(path, store) is not None:
+            continue
+        index = build(store["vectors"])
+        index["identity"] = np.asarray(store["identity"], dtype=np.int64)
+        tmp_path = f"{path}.{uuid.uuid4().hex}.tmp"
+        with open(tmp_path, "wb") as handle:
+            np.savez(handle, **index)
+        os.replace(tmp_path, path)
+        DERIVED_INDEX_CACHE[path] = index
+
+
+def _rebuild_derived_indexes(index_dir):
+    with _face_store_lock(index_dir):
+        _refresh_derived_indexes(index_dir, _open_face_store(_face_store_path(index_dir)))
+
+
+def _derived_store_index(index_dir, path, store):
+    index = _load_derived_index(path, store)
+    if index is None:
+        _schedule_face_store_task(("derive", index_dir), _rebuild_derived_indexes, index_dir)
+    return index
+
+
+def _event_ann_index(index_dir, store):
+    if not ANN_SEARCH or not store or len(store["vectors"]) < ANN_MIN_FACES:
+        return None
+    return _derived_store_index(index_dir, _ivf_index_path(index_dir), store)
+
+
+def _build_compact_index(vectors, seed=0):
+    rng = np.random.default_rng(seed)
+    sample = np.sort(rng.choice(len(vectors), min(len(vectors), COMPACT_TRAIN_ROWS), replace=False))
+    training = np.asarray(vectors[sample], dtype=np.float32)
+    mean = training.mean(axis=0)
+    training -= mean
+    eigenvalues, eigenvectors = np.linalg.eigh(training @ training.T)
+    top = np.argsort(eigenvalues)[::-1][:COMPACT_DIMS]
+    top = top[eigenvalues[top] > 1e-6]
+    components = (eigenvectors[:, top].T @ training) / np.sqrt(eigenvalues[top])[:, None]
+    components = np.ascontiguousarray(components, dtype=np.float32)
+
+    codes = np.empty((len(vectors), len(components)), dtype=np.int8)
+    scales = np.empty(len(vectors), dtype=np.float32)
+    code_norms = np.empty(len(vectors), dtype=np.float32)
+    for start in range(0, len(vectors), 4096):
+        block = np.asarray(vectors[start : start + 4096], dtype=np.float32) - mean
+        projected = block @ components.T
+        block_scales = np.abs(projected).max(axis=1, initial=0.0) / 127.0
+        block_scales[block_scales == 0] = 1.0
+        quantized = np.rint(projected / block_scales[:, None])
+        end = start + len(block)
+        codes[start:end] = quantized
+        scales[start:end] = block_scales
+        residual = np.einsum("ij,ij->i", block, block) - np.einsum("ij,ij->i", projected, projected)
+        reconstructed = quantized * block_scales[:, None]
+        code_norms[start:end] = np.einsum("ij,ij->i", reconstructed, reconstructed) + np.maximum(
+            residual, 0.0
+        )
+    return {
+        "mean": mean,
+        "components": components,
+        "codes": codes,
+        "scales": scales,
+        "code_norms": code_norms,
+    }
+
+
+def _compact_index_path(index_dir):
+    return os.path.join(index_dir, "compact.npz")
+
+
+def _event_compact_index(index_dir, store):
+    if not COMPACT_SEARCH or not store or len(store["vectors"]) < COMPACT_MIN_FACES:
+        return None
+    return _derived_store_index(index_dir, _compact_index_path(index_dir), store)
+
+
+def _compact_distances(compact, rows, query):
+    query = np.asarray(query, dtype=np.float32)
+    centered = np.atleast_2d(query) - compact["mean"]
+    projected = centered @ compact["components"].T
+    dots = (compact["codes"][rows] @ projected.T) * compact["scales"][rows, None]
+    distances = compact["code_norms"][rows, None] - 2.0 * dots
+    distances += np.einsum("ij,ij->i", centered, centered)
+    np.maximum(distances, 0.0, out=distances)
+    np.sqrt(distances, out=distances)
+    return distances if query.ndim == 2 else distances[:, 0]
+
+
+def _store_face_distances(index_dir, store, ranges, query):
+    distances = np.full((len(store["vectors"]), *np.shape(query)[:-1]), np.inf)
+    ivf = _event_ann_index(index_dir, store)
+    compact = _event_compact_index(index_dir, store)
+    if not ivf and not compact:
+        for start, end in ranges:
+            distances[start:end] = _face_distances(
+                store["vectors"][start:end], query, store["norms"][start:end]
+            )
+        return distances
+
+    rows = np.concatenate([np.arange(start, end) for start, end in ranges] or [np.zeros(0, np.int64)])
+    if ivf:
+        rows = np.intersect1d(rows, _ivf_candidates(ivf, query), assume_unique=True)
+    if not compact:
+        distances[rows] = _face_distances(store["vectors"][rows], query, store["norms"][rows])
+        return distances
+    approximate = _compact_distances(compact, rows, query)
+    distances[rows] = approximate
+    columns = approximate.reshape(len(rows), -1).T
+    rerank = rows[np.unique(np.concatenate([_top_k_indices(column, COMPACT_RERANK) for column in columns]))]
+    distances[rerank] = _face_distances(store["vectors"][rerank], query, store["norms"][rerank])
+    return distances
+
+
+def _store_row_ranges(starts, counts):
+    ends = starts + counts
+    breaks = np.flatnonzero(starts[1:] - ends[:-1] > FACE_STORE_RANGE_GAP) + 1
+    return list(
+        zip(starts[np.r_[0, breaks]].tolist(), ends[np.r_[breaks - 1, len(ends) - 1]].tolist())
+    )
+
+
+def _iter_face_store_scores(index_dir, store, photos, query, photo_path, chunk_size=0):
+    indexed = []
+    extra = []
+    for folder_name, filename, is_legacy, mtime in photos:
+        entry = store["photos"].get((is_legacy, folder_name, filename)) if store else None
+        if entry is not None and entry[2] >= mtime:
+            if entry[1]:
+                indexed.append((entry[0], entry[1], (folder_name, filename, is_legacy)))
+            continue
+        extra.append((folder_name, filename, is_legacy))
+    indexed.sort()
+
+    step = chunk_size or max(len(indexed), 1)
+    for begin in range(0, len(indexed), step):
+        chunk = indexed[begin : begin + step]
+        starts = np.fromiter((item[0] for item in chunk), dtype=np.int64, count=len(chunk))
+        counts = np.fromiter((item[1] for item in chunk), dtype=np.int64, count=len(chunk))
+        offsets = np.zeros(len(chunk), dtype=np.int64)
+        np.cumsum(counts[:-1], out=offsets[1:])
+        rows = np.repeat(starts - offsets, counts) + np.arange(int(counts.sum()))
+        with _timed("score"):
+            face_distances = _store_face_distances(
+                index_dir, store, _store_row_ranges(starts, counts), query
+            )
+            photo_distances = _photo_min_distances(
+                store["vectors"], rows, face_distances[rows], offsets, query
+            )
+        _count("photos_scanned", len(chunk))
+        scored = np.flatnonzero(np.isfinite(photo_distances).reshape(len(chunk), -1).any(axis=1))
+        yield [chunk[index][2] for index in scored], photo_distances[scored]
+
+    step = chunk_size or max(len(extra), 1)
+    for begin in range(0, len(extra), step):
+        extra_photos = []
+        extra_encodings = []
+        for folder_name, filename, is_legacy in extra[begin : begin + step]:
+            db_encodings = _indexed_face_encodings(
+                index_dir, folder_name, filename, photo_path(is_legacy, folder_name, filename), is_legacy
+            )
+            if db_encodings:
+                extra_photos.append((folder_name, filename, is_legacy))
+                extra_encodings.append(db_encodings)
+        _count("photos_scanned", len(extra[begin : begin + step]))
+        if extra_photos:
+            gallery, offsets = _stack_face_encodings(extra_encodings)
+            with _timed("score"):
+                photo_distances = _photo_min_distances(
+                    gallery, np.arange(len(gallery)), _face_distances(gallery, query), offsets, query
+                )
+            yield extra_photos, photo_distances
+
+
+def _photo_face_matrix(index_dir, store, photo, mtime, photo_path):
+    folder_name, filename, is_legacy = photo
+    entry = store["photos"].get((is_legacy, folder_name, filename)) if store else None
+    if entry is not None and entry[2] >= mtime:
+        return store["vectors"][entry[0] : entry[0] + entry[1]]
+    encodings = _indexed_face_encodings(
+        index_dir, folder_name, filename, photo_path(is_legacy, folder_name, filename), is_legacy
+    )
+    return np.asarray(encodings, dtype=np.float32).reshape(len(encodings), FACE_ENCODING_SIZE)
+
+
+def _distinct_face_match(faces, queries, max_distance):
+    if len(faces) < len(queries):
+        return False
+    allowed = _face_distances(faces, queries) <= max_distance
+    owners = [-1] * len(faces)
+
+    def assign(query, visited):
+        for face in np.flatnonzero(allowed[:, query]).tolist():
+            if face in visited:
+                continue
+            visited.add(face)
+            if owners[face] < 0 or assign(owners[face], visited):
+                owners[face] = query
+                return True
+        return False
+
+    return all(assign(query, set()) for query in range(len(queries)))
+
+
+def _score_face_store(index_dir, store, photos, query, photo_path):
+    gallery_photos = []
+    chunks = [np.zeros((0, *np.shape(query)[:-1]), dtype=np.float64)]
+    for chunk_photos, chunk_distances in _iter_face_store_scores(index_dir, store, photos, query, photo_path):
+        gallery_photos.extend(chunk_photos)
+        chunks.append(chunk_distances)
+    return gallery_photos, np.concatenate(chunks)
+
+
+class _ZipStreamSink:
+    def __init__(self):
+        self._chunks = []
+        self._offset = 0
+
+    def write(self, data):
+        self._chunks.append(bytes(data))
+        self._offset += len(data)
+        return len(data)
+
+    def tell(self):
+        return self._offset
+
+    def flush(self):
+        pass
+
+    def drain(self):
+        data = b"".join(self._chunks)
+        self._chunks.clear()
+        return data
+
+
+def _stream_zip(entries):
+    sink = _ZipStreamSink()
+    writing = 0.0
+    try:
+        with zipfile.ZipFile(sink, "w") as archive:
+            for path, arcname in entries:
+                try:
+                    source = open(path, "rb")
+                except OSError:
+                    continue
+                with source:
+                    info = zipfile.ZipInfo.from_file(path, arcname)
+                    info.compress_type = (
+                        zipfile.ZIP_STORED if _is_allowed(path) else zipfile.ZIP_DEFLATED
+                    )
+                    with archive.open(info, "w", force_zip64=info.file_size >= zipfile.ZIP64_LIMIT) as dest:
+                        while True:
+                            started = time.perf_counter()
+                            chunk = source.read(ZIP_STREAM_CHUNK_SIZE)
+                            if chunk:
+                                dest.write(chunk)
+                            data = sink.drain()
+                            writing += time.perf_counter() - started
+                            if not chunk:
+                                break
+                            if data:
+                                _count("zip_bytes_streamed", len(data))
+                                yield data
+                data = sink.drain()
+                if data:
+                    _count("zip_bytes_streamed", len(data))
+                    yield data
+        data = sink.drain()
+        _count("zip_bytes_streamed", len(data))
+        yield data
+    finally:
+        _record_stage("zip_write", writing)
+
+
 def _photographer_logged_in():
     return session.get("photographer_logged_in", False) and session.get("photographer_id")
 
@@ -238,22 +2145,260 @@ def _current_photographer_id():
     return session.get("photographer_id")
 
 
-def _cleanup_match_cache():
-    now = time.time()
-    expired = [key for key, item in MATCH_CACHE.items() if now - item["ts"] > MATCH_CACHE_TTL]
-    for key in expired:
-        MATCH_CACHE.pop(key, None)
+class _MemoryMatchCache:
+    def __init__(self, max_entries, max_bytes):
+        self.max_entries = max(max_entries, 1)
+        self.max_bytes = max_bytes
+        self.entries = OrderedDict()
+        self.size = 0
+        self.lock = threading.Lock()
+
+    def _discard(self, key):
+        item = self.entries.pop(key, None)
+        if item is not None:
+            self.size -= len(item[0])
+
+    def get(self, key):
+        with self.lock:
+            item = self.entries.get(key)
+            if item is None:
+                return None
+            if item[1] < time.time():
+                self._discard(key)
+                return None
+            self.entries.move_to_end(key)
+            return item[0]
+
+    def set(self, key, value, ttl):
+        if len(value) > self.max_bytes:
+            return
+        with self.lock:
+            self._discard(key)
+            self.entries[key] = (value, time.time() + ttl)
+            self.size += len(value)
+            while len(self.entries) > self.max_entries or self.size > self.max_bytes:
+                self._discard(next(iter(self.entries)))
+
+
+class _SQLiteMatchCache:
+    def __init__(self, path, max_entries, max_bytes):
+        self.path = path
+        self.max_entries = max(max_entries, 1)
+        self.max_bytes = max_bytes
+        self.local = threading.local()
+
+    def _conn(self):
+        conn = getattr(self.local, "conn", None)
+        if conn is not None and self.local.pid == os.getpid():
+            return conn
+        _ensure_dir(os.path.dirname(self.path))
+        conn = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=OFF")
+        conn.executescript(
+            "CREATE TABLE IF NOT EXISTS cache ("
+            "key TEXT PRIMARY KEY, value BLOB NOT NULL, expires REAL NOT NULL, accessed REAL NOT NULL);"
+            "CREATE INDEX IF NOT EXISTS cache_accessed ON cache (accessed);"
+        )
+        self.local.conn = conn
+        self.local.pid = os.getpid()
+        return conn
+
+    def get(self, key):
+        conn = self._conn()
+        now = time.time()
+        row = conn.execute(
+            "SELECT value, accessed FROM cache WHERE key = ? AND expires >= ?", (key, now)
+        ).fetchone()
+        if row is None:
+            return None
+        if now - row[1] > MATCH_CACHE_TOUCH_INTERVAL:
+            conn.execute("UPDATE cache SET accessed = ? WHERE key = ?", (now, key))
+        return bytes(row[0])
+
+    def set(self, key, value, ttl):
+        if len(value) > self.max_bytes:
+            return
+        conn = self._conn()
+        now = time.time()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            conn.execute(
+                "INSERT OR REPLACE INTO cache (key, value, expires, accessed) VALUES (?, ?, ?, ?)",
+                (key, value, now + ttl, now),
+            )
+            conn.execute("DELETE FROM cache WHERE expires < ?", (now,))
+            evicted = []
+            total = 0
+            rows = conn.execute("SELECT key, length(value) FROM cache ORDER BY accessed DESC").fetchall()
+            for index, (cached_key, size) in enumerate(rows):
+                total += size
+                if index >= self.max_entries or total > self.max_bytes:
+                    evicted.append((cached_key,))
+            conn.executemany("DELETE FROM cache WHERE key = ?", evicted)
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        conn.execute("COMMIT")
+
+
+class _RedisMatchCache:
+    def __init__(self, client, max_entries, prefix="scnr:match:"):
+        self.client = client
+        self.max_entries = max(max_entries, 1)
+        self.prefix = prefix
+        self.index_key = f"{prefix}lru"
+
+    def get(self, key):
+        value = self.client.get(self.prefix + key)
+        if value is not None:
+            self.client.zadd(self.index_key, {key: time.time()})
+        return value
+
+    def set(self, key, value, ttl):
+        self.client.set(self.prefix + key, value, ex=max(int(ttl), 1))
+        self.client.zadd(self.index_key, {key: time.time()})
+        overflow = self.client.zcard(self.index_key) - self.max_entries
+        if overflow > 0:
+            evicted = [
+                member.decode("utf-8") if isinstance(member, bytes) else member
+                for member, _ in self.client.zpopmin(self.index_key, overflow)
+            ]
+            self.client.delete(*[self.prefix + member for member in evicted])
+
+
+def _match_cache():
+    global MATCH_CACHE
+    with MATCH_CACHE_LOCK:
+        if MATCH_CACHE is None:
+            url = MATCH_CACHE_URL
+            if url == "memory://":
+                MATCH_CACHE = _MemoryMatchCache(MATCH_CACHE_SIZE, MATCH_CACHE_BYTES)
+            elif url.startswith(("redis://", "rediss://", "unix://")):
+                import redis
+
+                MATCH_CACHE = _RedisMatchCache(redis.Redis.from_url(url), MATCH_CACHE_SIZE)
+            else:
+                path = url[len("sqlite:///") - 1 :] if url.startswith("sqlite:///") else MATCH_CACHE_FILE
+                MATCH_CACHE = _SQLiteMatchCache(path, MATCH_CACHE_SIZE, MATCH_CACHE_BYTES)
+        return MATCH_CACHE
+
+
+def _cache_get_json(key):
+    with _timed("cache"):
+        value = _match_cache().get(key)
+    if value is None:
+        _count("match_cache_misses")
+        return None
+    _count("match_cache_hits")
+    try:
+        return json.loads(value)
+    except ValueError:
+        return None
 
 
-def _store_match_cache(event_id, code, matches):
-    _cleanup_match_cache()
-    token = uuid.uuid4().hex
-    MATCH_CACHE[token] = {
-        "event_id": event_id,
-        "code": code,
+def _cache_set_json(key, value):
+    _match_cache().set(key, json.dumps(value, separators=(",", ":")).encode("utf-8"), MATCH_CACHE_TTL)
+
+
+def _expand_matches(event_id, code, compact):
+    conn = _db()
+    ids = [photo_id for photo_id, _ in compact]
+    rows = {
+        row["rowid"]: row
+        for row in conn.execute(
+            "SELECT rowid, legacy, folder, filename, sha256 FROM photos "
+            "WHERE event_id = ? AND rowid IN (SELECT value FROM json_each(?))",
+            (event_id, json.dumps(ids)),
+        )
+    }
+    hashes = sorted({row["sha256"] for row in rows.values() if row["sha256"]})
+    copies = {}
+    for row in conn.execute(
+        "SELECT DISTINCT sha256, folder FROM photos "
+        "WHERE event_id = ? AND sha256 IN (SELECT value FROM json_each(?))",
+        (event_id, json.dumps(hashes)),
+    ):
+        copies.setdefault(row["sha256"], []).append(row["folder"])
+
+    matches = []
+    for photo_id, confidence in compact:
+        row = rows.get(photo_id)
+        if row is None:
+            continue
+        name = row["filename"]
+        folder_name = row["folder"]
+        matches.append(
+            {
+                "filename": name,
+                "folder": folder_name,
+                "folders": sorted(copies.get(row["sha256"], [folder_name]), key=lambda item: item.lower()),
+                "confidence": confidence,
+                "url": (
+                    f"/events/{event_id}/photos/{name}?code={code}"
+                    if row["legacy"]
+                    else f"/events/{event_id}/folders/{folder_name}/photos/{name}?code={code}"
+                ),
+            }
+        )
+    return matches
+
+
+def _match_response(event_id, code, compact):
+    matches = _expand_matches(event_id, code, compact)
+    if not matches:
+        return None
+    best = matches[0]
+    return {
+        "best_match": best["filename"],
+        "best_folder": best["folder"],
+        "confidence": best["confidence"],
+        "match_image_url": best["url"],
         "matches": matches,
-        "ts": time.time(),
     }
+
+
+def _event_match_photos(photographer_id, event_id, folder):
+    rows = _catalog_photos(event_id)
+    if folder != "all":
+        rows = [row for row in rows if row["folder"] == folder]
+    if not rows:
+        return None, None, None
+    photo_ids = {(row["folder"], row["filename"], bool(row["legacy"])): row["rowid"] for row in rows}
+    photos = [
+        (row["folder"], row["filename"], bool(row["legacy"]), row["mtime"], row["sha256"]) for row in rows
+    ]
+    store = _event_face_store(photographer_id, event_id)
+    return photo_ids, _dedupe_catalog_photos(photos, store), store
+
+
+def _event_match_scores(photographer_id, event_id, folder, query):
+    photo_ids, photos, store = _event_match_photos(photographer_id, event_id, folder)
+    if not photos:
+        return None, None, "No images found in this event."
+
+    gallery_photos, photo_distances = _score_face_store(
+        _event_index_dir(photographer_id, event_id),
+        store,
+        photos,
+        query,
+        partial(_event_photo_path, photographer_id, event_id),
+    )
+    if not gallery_photos:
+        return None, None, "No faces found in event images."
+    return np.asarray([photo_ids[photo] for photo in gallery_photos]), photo_distances, None
+
+
+def _ranked_matches(photo_ids, distances, k=0, candidates=None):
+    if candidates is None:
+        candidates = np.flatnonzero(np.isfinite(distances))
+    order = candidates[_top_k_indices(distances[candidates], k)]
+    return [[int(photo_ids[index]), round(1.0 / (1.0 + float(distances[index])), 4)] for index in order]
+
+
+def _store_match_cache(event_id, compact):
+    token = uuid.uuid4().hex
+    _cache_set_json(f"token:{token}", {"event_id": event_id, "matches": compact})
     return token
 
 
@@ -300,9 +2445,8 @@ def photographer_signup():
     if _find_photographer_by_username(username):
         return redirect(url_for("photographer_page", error="Username already exists"))
 
-    photographers = _load_photographers()
     photographer_id = uuid.uuid4().hex[:10]
-    photographers.append(
+    created = _insert_photographer(
         {
             "id": photographer_id,
             "client_name": client_name,
@@ -310,7 +2454,8 @@ def photographer_signup():
             "password_hash": generate_password_hash(password),
         }
     )
-    _save_photographers(photographers)
+    if not created:
+        return redirect(url_for("photographer_page", error="Username already exists"))
     _ensure_dir(_photographer_dir(photographer_id))
 
     session["photographer_logged_in"] = True
@@ -356,6 +2501,9 @@ def event_photo_file(event_id, filename):
         return jsonify(error="Event not found."), 404
     if event["code"] != code:
         return jsonify(error="Invalid access code."), 403
+    size = request.args.get("size", type=int)
+    if size:
+        return _send_event_thumbnail(photographer_id, event_id, "default", filename, size, True)
     return send_from_directory(_event_photo_dir(photographer_id, event_id), filename)
 
 
@@ -368,6 +2516,9 @@ def event_folder_photo_file(event_id, folder, filename):
     if event["code"] != code:
         return jsonify(error="Invalid access code."), 403
     safe_folder = _safe_folder_name(folder)
+    size = request.args.get("size", type=int)
+    if size:
+        return _send_event_thumbnail(photographer_id, event_id, safe_folder, filename, size)
     return send_from_directory(_event_folder_dir(photographer_id, event_id, safe_folder), filename)
 
 
@@ -396,12 +2547,7 @@ def list_event_folders(event_id):
 
 @app.route("/database/list", methods=["GET"])
 def list_database_images():
-    _ensure_dir(DB_DIR)
-    files = [
-        f for f in os.listdir(DB_DIR)
-        if os.path.splitext(f)[1].lower() in ALLOWED_EXTENSIONS
-    ]
-    files.sort(key=lambda name: name.lower())
+    files = sorted(_database_indexed_files(), key=lambda name: name.lower())
     return jsonify(
         images=[
             {"filename": name, "url": f"/database/{name}"}
@@ -421,13 +2567,9 @@ def create_event():
         return jsonify(error="Event name is required."), 400
 
     photographer_id = _current_photographer_id()
-    events = _load_events_for(photographer_id)
     event_id = uuid.uuid4().hex[:8]
     code = _generate_code()
-    events.append(
-        {"id": event_id, "name": name, "code": code}
-    )
-    _save_events_for(photographer_id, events)
+    _insert_event(photographer_id, {"id": event_id, "name": name, "code": code})
 
     _ensure_dir(_event_photo_dir(photographer_id, event_id))
     _ensure_dir(_event_upload_dir(photographer_id, event_id))
@@ -450,45 +2592,39 @@ def list_event_photos(event_id):
         return jsonify(error="Invalid access code."), 403
 
     folder = request.args.get("folder", "default").strip().lower()
-    images = []
-
-    legacy_dir = _event_photo_dir(photographer_id, event_id)
-    if os.path.isdir(legacy_dir):
-        for name in os.listdir(legacy_dir):
-            if os.path.splitext(name)[1].lower() in ALLOWED_EXTENSIONS:
-                images.append(
-                    {
-                        "filename": name,
-                        "folder": "default",
-                        "url": f"/events/{event_id}/photos/{name}?code={code}",
-                    }
-                )
-
-    if folder and folder != "all":
-        safe_folder = _safe_folder_name(folder)
-        folder_dirs = [safe_folder]
-    else:
-        folder_dirs = [
-            name for name in _list_event_folders(photographer_id, event_id)
-            if name != "default"
-        ]
-
-    for folder_name in folder_dirs:
-        folder_dir = _event_folder_dir(photographer_id, event_id, folder_name)
-        if not os.path.isdir(folder_dir):
-            continue
-        for name in os.listdir(folder_dir):
-            if os.path.splitext(name)[1].lower() in ALLOWED_EXTENSIONS:
-                images.append(
-                    {
-                        "filename": name,
-                        "folder": folder_name,
-                        "url": f"/events/{event_id}/folders/{folder_name}/photos/{name}?code={code}",
-                    }
-                )
-
-    images.sort(key=lambda item: item["filename"].lower())
-    return jsonify(images=images)
+    folder = _safe_folder_name(folder) if folder and folder != "all" else None
+    limit = request.args.get("limit", type=int)
+    offset = request.args.get("offset", 0, type=int)
+    cursor = request.args.get("cursor", "")
+    after = _decode_photo_cursor(cursor) if cursor else None
+    if cursor and after is None:
+        return jsonify(error="Invalid cursor."), 400
+    if limit is not None:
+        limit = min(max(limit, 1), PHOTO_PAGE_MAX)
+    offset = max(offset, 0)
+
+    if not cursor and not offset:
+        _reconcile_event_catalog(photographer_id, event_id)
+    rows = _catalog_photos(event_id, folder, limit=limit, offset=offset, after=after)
+    next_cursor = None
+    if limit is not None and len(rows) == limit:
+        next_cursor = _encode_photo_cursor(rows[-1])
+    images = [
+        {
+            "filename": row["filename"],
+            "folder": row["folder"],
+            "url": (
+                f"/events/{event_id}/photos/{row['filename']}?code={code}"
+                if row["legacy"]
+                else f"/events/{event_id}/folders/{row['folder']}/photos/{row['filename']}?code={code}"
+            ),
+        }
+        for row in rows
+    ]
+    payload = {"images": images, "next_cursor": next_cursor}
+    if not cursor and not offset:
+        payload["total"] = _count_catalog_photos(event_id, folder)
+    return jsonify(payload)
 
 
 @app.route("/events/<event_id>/photos/upload", methods=["POST"])
@@ -505,56 +2641,121 @@ def upload_event_photos(event_id):
         return jsonify(error="No files selected."), 400
 
     folder = _safe_folder_name(request.form.get("folder", "default"))
-    photo_dir = _event_folder_dir(photographer_id, event_id, folder)
-    _ensure_dir(photo_dir)
+    uploads = [(file.filename, file.stream) for file in files if file.filename]
+    payload, error = _ingest_event_uploads(photographer_id, event_id, event["code"], folder, uploads)
+    if error:
+        return jsonify(error=error), 400
+    return jsonify(payload)
 
-    saved_files = []
 
-    for file in files:
-        if file.filename == "":
-            continue
-        ext = os.path.splitext(file.filename)[1].lower()
-        if ext in ZIP_EXTENSIONS:
-            try:
-                with zipfile.ZipFile(file.stream) as archive:
-                    members = _safe_zip_members(archive.namelist())
-                    for member in members:
-                        safe_name = _safe_filename(os.path.basename(member))
-                        if os.path.exists(os.path.join(photo_dir, safe_name)):
-                            base, ext = os.path.splitext(safe_name)
-                            safe_name = f"{base}-{uuid.uuid4().hex[:6]}{ext}"
-                        with archive.open(member) as src:
-                            target_path = os.path.join(photo_dir, safe_name)
-                            with open(target_path, "wb") as dest:
-                                dest.write(src.read())
-                        saved_files.append(safe_name)
-            except zipfile.BadZipFile:
-                return jsonify(error="Invalid ZIP file."), 400
-            continue
-
-        if not _is_allowed(file.filename):
-            return jsonify(error="Only JPG, PNG, or ZIP files are allowed."), 400
+@app.route("/events/<event_id>/upload-sessions", methods=["POST"])
+def create_upload_session(event_id):
+    photographer_id = _current_photographer_id()
+    event = _find_event(event_id, photographer_id=photographer_id)
+    if not event:
+        return jsonify(error="Event not found."), 404
+    auth_error = _require_photographer()
+    if auth_error:
+        return auth_error
+    payload = request.get_json(silent=True) or {}
+    filename = os.path.basename(str(payload.get("filename", "")))
+    if not filename:
+        return jsonify(error="Filename is required."), 400
+    if not _is_allowed(filename) and os.path.splitext(filename)[1].lower() not in ZIP_EXTENSIONS:
+        return jsonify(error="Only JPG, PNG, or ZIP files are allowed."), 400
+    size = payload.get("size")
+    if size is not None and (not isinstance(size, int) or size < 0):
+        return jsonify(error="Invalid size."), 400
+
+    upload_id = uuid.uuid4().hex
+    meta_path, part_path = _upload_session_paths(photographer_id, event_id, upload_id)
+    _write_json_atomic(
+        meta_path,
+        {
+            "id": upload_id,
+            "filename": filename,
+            "folder": _safe_folder_name(payload.get("folder", "default")),
+            "size": size,
+            "created": time.time(),
+        },
+    )
+    open(part_path, "wb").close()
+    return jsonify(upload_id=upload_id, offset=0, size=size)
 
-        safe_name = _safe_filename(file.filename)
-        if os.path.exists(os.path.join(photo_dir, safe_name)):
-            base, ext = os.path.splitext(safe_name)
-            safe_name = f"{base}-{uuid.uuid4().hex[:6]}{ext}"
 
-        save_path = os.path.join(photo_dir, safe_name)
-        file.save(save_path)
-        saved_files.append(safe_name)
+@app.route("/events/<event_id>/upload-sessions/<upload_id>", methods=["GET", "PUT"])
+def upload_session(event_id, upload_id):
+    photographer_id = _current_photographer_id()
+    event = _find_event(event_id, photographer_id=photographer_id)
+    if not event:
+        return jsonify(error="Event not found."), 404
+    auth_error = _require_photographer()
+    if auth_error:
+        return auth_error
+    upload = _load_upload_session(photographer_id, event_id, upload_id)
+    if not upload:
+        return jsonify(error="Upload not found."), 404
+    current = os.path.getsize(upload["part_path"])
+    if request.method == "GET":
+        return jsonify(upload_id=upload_id, offset=current, size=upload["size"])
+
+    offset = request.args.get("offset", type=int)
+    if offset is None or offset < 0 or offset > current:
+        return jsonify(error="Offset mismatch.", offset=current), 409
+    with open(upload["part_path"], "r+b") as handle:
+        handle.seek(offset)
+        for chunk in iter(partial(request.stream.read, UPLOAD_CHUNK_SIZE), b""):
+            if upload["size"] is not None and handle.tell() + len(chunk) > upload["size"]:
+                return jsonify(error="Chunk exceeds declared size.", offset=max(current, handle.tell())), 400
+            handle.write(chunk)
+        offset = handle.tell()
+    return jsonify(upload_id=upload_id, offset=max(current, offset), size=upload["size"])
+
+
+@app.route("/events/<event_id>/upload-sessions/<upload_id>/complete", methods=["POST"])
+def complete_upload_session(event_id, upload_id):
+    photographer_id = _current_photographer_id()
+    event = _find_event(event_id, photographer_id=photographer_id)
+    if not event:
+        return jsonify(error="Event not found."), 404
+    auth_error = _require_photographer()
+    if auth_error:
+        return auth_error
+    upload = _load_upload_session(photographer_id, event_id, upload_id)
+    if not upload:
+        return jsonify(error="Upload not found."), 404
+    current = os.path.getsize(upload["part_path"])
+    if upload["size"] is not None and current != upload["size"]:
+        return jsonify(error="Upload is incomplete.", offset=current), 409
+
+    try:
+        with open(upload["part_path"], "rb") as handle:
+            payload, error = _ingest_event_uploads(
+                photographer_id, event_id, event["code"], upload["folder"], [(upload["filename"], handle)]
+            )
+    finally:
+        for path in (upload["part_path"], upload["meta_path"]):
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+    if error:
+        return jsonify(error=error), 400
+    return jsonify(payload)
 
-    if not saved_files:
-        return jsonify(error="No valid images found in upload."), 400
 
-    return jsonify(
-        saved_files=saved_files,
-        image_urls=[
-            f"/events/{event_id}/folders/{folder}/photos/{name}?code={event['code']}"
-            for name in saved_files
-        ],
-        folder=folder,
-    )
+@app.route("/events/<event_id>/jobs/<job_id>", methods=["GET"])
+def ingest_job_status(event_id, job_id):
+    auth_error = _require_photographer()
+    if auth_error:
+        return auth_error
+    photographer_id = _current_photographer_id()
+    if not _find_event(event_id, photographer_id=photographer_id):
+        return jsonify(error="Event not found."), 404
+    job = _load_ingest_job(photographer_id, event_id, job_id)
+    if not job:
+        return jsonify(error="Job not found."), 404
+    return jsonify(job)
 
 
 @app.route("/events/<event_id>/update", methods=["POST"])
@@ -565,17 +2766,8 @@ def update_event(event_id):
     name = request.form.get("name", "").strip()
     if not name:
         return jsonify(error="Event name is required."), 400
-    photographer_id = _current_photographer_id()
-    events = _load_events_for(photographer_id)
-    updated = False
-    for event in events:
-        if event["id"] == event_id:
-            event["name"] = name
-            updated = True
-            break
-    if not updated:
+    if not _rename_event(_current_photographer_id(), event_id, name):
         return jsonify(error="Event not found."), 404
-    _save_events_for(photographer_id, events)
     return redirect(url_for("photographer_page"))
 
 
@@ -603,30 +2795,24 @@ def upload():
         return jsonify(error="No face found in the uploaded image."), 400
     selfie_encoding = selfie_encodings[0]
 
-    db_files = [
-        f for f in os.listdir(DB_DIR)
-        if os.path.splitext(f)[1].lower() in ALLOWED_EXTENSIONS
-    ]
-    if not db_files:
+    store = _database_face_store()
+    files = _database_files()
+    if not files:
         return jsonify(error="No images found in the database folder."), 400
 
-    best_match = None
-    best_distance = None
-
-    for filename in db_files:
-        db_path = os.path.join(DB_DIR, filename)
-        db_encodings = _load_face_encodings(db_path)
-        if not db_encodings:
-            continue
-        for db_encoding in db_encodings:
-            distance = _face_distance(db_encoding, selfie_encoding)
-            if best_distance is None or distance < best_distance:
-                best_distance = float(distance)
-                best_match = filename
-
-    if best_match is None:
+    gallery_photos, photo_distances = _score_face_store(
+        DB_INDEX_DIR,
+        store,
+        [("default", filename, True, mtime) for filename, mtime in files.items()],
+        selfie_encoding,
+        _database_photo_path,
+    )
+    if not gallery_photos:
         return jsonify(error="No faces found in database images."), 400
 
+    best_index = int(np.argmin(photo_distances))
+    best_match = gallery_photos[best_index][1]
+    best_distance = float(photo_distances[best_index])
     confidence = 1.0 / (1.0 + best_distance)
 
     return jsonify(
@@ -649,7 +2835,6 @@ def upload_to_database():
         return jsonify(error="Only JPG and PNG files are allowed."), 400
 
     _ensure_dir(DB_DIR)
-
     safe_name = _safe_filename(file.filename)
     if os.path.exists(os.path.join(DB_DIR, safe_name)):
         base, ext = os.path.splitext(safe_name)
@@ -657,10 +2842,13 @@ def upload_to_database():
 
     save_path = os.path.join(DB_DIR, safe_name)
     file.save(save_path)
+    faces = _encode_photo_job(save_path, DB_INDEX_DIR, "default", safe_name, True)
+    _schedule_database_compaction()
 
     return jsonify(
         filename=safe_name,
         image_url=f"/database/{safe_name}",
+        faces=faces,
     )
 
 
@@ -676,24 +2864,23 @@ def login_event(event_id):
     return jsonify(success=True)
 
 
-@app.route("/events/<event_id>/match", methods=["POST"])
-def match_event(event_id):
+def _prepare_event_match(event_id):
     event, photographer_id = _find_event(event_id)
     if not event:
-        return jsonify(error="Event not found."), 404
+        return None, (jsonify(error="Event not found."), 404)
 
     if "file" not in request.files:
-        return jsonify(error="No file part in the request."), 400
+        return None, (jsonify(error="No file part in the request."), 400)
 
     code = request.form.get("code", "")
     if event["code"] != code:
-        return jsonify(error="Invalid access code."), 403
+        return None, (jsonify(error="Invalid access code."), 403)
 
     file = request.files["file"]
     if file.filename == "":
-        return jsonify(error="No file selected."), 400
+        return None, (jsonify(error="No file selected."), 400)
     if not _is_allowed(file.filename):
-        return jsonify(error="Only JPG and PNG files are allowed."), 400
+        return None, (jsonify(error="Only JPG and PNG files are allowed."), 400)
 
     upload_dir = _event_upload_dir(photographer_id, event_id)
     _ensure_dir(upload_dir)
@@ -701,107 +2888,231 @@ def match_event(event_id):
     ext = os.path.splitext(file.filename)[1].lower()
     upload_name = f"{uuid.uuid4().hex}{ext}"
     upload_path = os.path.join(upload_dir, upload_name)
-    file.save(upload_path)
+    selfie_hash = _save_stream(file.stream, upload_path)
 
-    selfie_encodings = _load_face_encodings(upload_path)
+    folder = request.form.get("folder", "all").strip().lower()
+    folder = _safe_folder_name(folder) if folder and folder != "all" else "all"
+    _reconcile_event_catalog(photographer_id, event_id)
+    return {
+        "photographer_id": photographer_id,
+        "code": code,
+        "folder": folder,
+        "upload_path": upload_path,
+        "uploaded_image_url": f"/events/{event_id}/uploads/{upload_name}",
+        "cache_key": f"result:{event_id}:{selfie_hash}:{folder}:{_event_index_version(event_id)}",
+    }, None
+
+
+@app.route("/events/<event_id>/match", methods=["POST"])
+def match_event(event_id):
+    match, error = _prepare_event_match(event_id)
+    if error:
+        return error
+    code = match["code"]
+    uploaded_image_url = match["uploaded_image_url"]
+
+    compact = _cache_get_json(match["cache_key"])
+    result = _match_response(event_id, code, compact) if compact else None
+    if result:
+        return jsonify(
+            **result,
+            uploaded_image_url=uploaded_image_url,
+            match_token=_store_match_cache(event_id, compact),
+        )
+
+    selfie_encodings = _load_face_encodings(match["upload_path"])
     if not selfie_encodings:
         return jsonify(error="No face found in the uploaded image."), 400
     selfie_encoding = selfie_encodings[0]
 
-    folder = request.form.get("folder", "all").strip().lower()
-    photo_dirs = []
-    folder_map = {}
-    legacy_dir = _event_photo_dir(photographer_id, event_id)
-    if os.path.isdir(legacy_dir):
-        photo_dirs.append(("default", legacy_dir, True))
-    for folder_name in _list_event_folders(photographer_id, event_id):
-        if folder_name == "default":
-            continue
-        folder_dir = _event_folder_dir(photographer_id, event_id, folder_name)
-        if os.path.isdir(folder_dir):
-            photo_dirs.append((folder_name, folder_dir, False))
-
-    if folder and folder != "all":
-        safe_folder = _safe_folder_name(folder)
-        photo_dirs = [
-            (name, path, legacy)
-            for name, path, legacy in photo_dirs
-            if name == safe_folder
-        ]
+    photo_ids, photo_distances, error = _event_match_scores(
+        match["photographer_id"], event_id, match["folder"], selfie_encoding
+    )
+    if error:
+        return jsonify(error=error), 400
 
-    if not photo_dirs:
-        return jsonify(error="No images found in this event."), 400
+    compact = _ranked_matches(photo_ids, photo_distances, MATCH_TOP_K)
+    _cache_set_json(match["cache_key"], compact)
+    result = _match_response(event_id, code, compact)
+    if not result:
+        return jsonify(error="No faces found in event images."), 400
 
-    best_match = None
-    best_distance = None
-    match_scores = []
+    return jsonify(
+        **result,
+        uploaded_image_url=uploaded_image_url,
+        match_token=_store_match_cache(event_id, compact),
+    )
 
-    for folder_name, folder_path, is_legacy in photo_dirs:
-        for filename in os.listdir(folder_path):
-            if os.path.splitext(filename)[1].lower() not in ALLOWED_EXTENSIONS:
-                continue
-            db_path = os.path.join(folder_path, filename)
-            db_encodings = _load_face_encodings(db_path)
-            if not db_encodings:
-                continue
-            min_distance = None
-            for db_encoding in db_encodings:
-                distance = _face_distance(db_encoding, selfie_encoding)
-                if min_distance is None or distance < min_distance:
-                    min_distance = distance
-            if min_distance is None:
-                continue
-            match_scores.append((folder_name, filename, min_distance, is_legacy))
-            if best_distance is None or min_distance < best_distance:
-                best_distance = min_distance
-                best_match = (folder_name, filename, is_legacy)
 
-    if best_match is None:
-        return jsonify(error="No faces found in event images."), 400
+def _sse_event(name, payload):
+    return f"event: {name}\ndata: {json.dumps(payload)}\n\n"
 
-    match_scores.sort(key=lambda item: item[2])
-    confidence = 1.0 / (1.0 + best_distance)
-    matches = [
+
+def _stream_event_match(event_id, match, query, photo_ids, photos, store):
+    code = match["code"]
+    gallery_ids = []
+    chunks = [np.zeros(0, dtype=np.float64)]
+    for chunk_photos, chunk_distances in _iter_face_store_scores(
+        _event_index_dir(match["photographer_id"], event_id),
+        store,
+        photos,
+        query,
+        partial(_event_photo_path, match["photographer_id"], event_id),
+        MATCH_STREAM_CHUNK,
+    ):
+        gallery_ids.extend(photo_ids[photo] for photo in chunk_photos)
+        chunks.append(chunk_distances)
+        preview = _ranked_matches(np.asarray(gallery_ids), np.concatenate(chunks), MATCH_STREAM_PREVIEW)
+        yield _sse_event(
+            "progress",
+            {"matches": _expand_matches(event_id, code, preview), "scanned": len(gallery_ids)},
+        )
+
+    compact = _ranked_matches(np.asarray(gallery_ids), np.concatenate(chunks), MATCH_TOP_K)
+    _cache_set_json(match["cache_key"], compact)
+    result = _match_response(event_id, code, compact)
+    if not result:
+        yield _sse_event("error", {"error": "No faces found in event images."})
+        return
+    yield _sse_event(
+        "done",
         {
-            "filename": name,
-            "folder": folder_name,
-            "confidence": round(1.0 / (1.0 + distance), 4),
-            "url": (
-                f"/events/{event_id}/photos/{name}?code={code}"
-                if is_legacy
-                else f"/events/{event_id}/folders/{folder_name}/photos/{name}?code={code}"
-            ),
-        }
-        for folder_name, name, distance, is_legacy in match_scores
+            **result,
+            "uploaded_image_url": match["uploaded_image_url"],
+            "match_token": _store_match_cache(event_id, compact),
+        },
+    )
+
+
+@app.route("/events/<event_id>/match/stream", methods=["POST"])
+def match_event_stream(event_id):
+    match, error = _prepare_event_match(event_id)
+    if error:
+        return error
+    headers = {"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+
+    compact = _cache_get_json(match["cache_key"])
+    result = _match_response(event_id, match["code"], compact) if compact else None
+    if result:
+        done = _sse_event(
+            "done",
+            {
+                **result,
+                "uploaded_image_url": match["uploaded_image_url"],
+                "match_token": _store_match_cache(event_id, compact),
+            },
+        )
+        return Response(done, mimetype="text/event-stream", headers=headers)
+
+    selfie_encodings = _load_face_encodings(match["upload_path"])
+    if not selfie_encodings:
+        return jsonify(error="No face found in the uploaded image."), 400
+
+    photo_ids, photos, store = _event_match_photos(match["photographer_id"], event_id, match["folder"])
+    if not photos:
+        return jsonify(error="No images found in this event."), 400
+
+    return Response(
+        _stream_event_match(event_id, match, selfie_encodings[0], photo_ids, photos, store),
+        mimetype="text/event-stream",
+        headers=headers,
+    )
+
+
+@app.route("/events/<event_id>/match/batch", methods=["POST"])
+def match_event_batch(event_id):
+    event, photographer_id = _find_event(event_id)
+    if not event:
+        return jsonify(error="Event not found."), 404
+
+    code = request.form.get("code", "")
+    if event["code"] != code:
+        return jsonify(error="Invalid access code."), 403
+
+    files = [file for file in request.files.getlist("files") + request.files.getlist("file") if file.filename]
+    if not files:
+        return jsonify(error="No files selected."), 400
+    if not all(_is_allowed(file.filename) for file in files):
+        return jsonify(error="Only JPG and PNG files are allowed."), 400
+
+    upload_dir = _event_upload_dir(photographer_id, event_id)
+    _ensure_dir(upload_dir)
+    queries = []
+    sources = []
+    for file in files:
+        upload_name = f"{uuid.uuid4().hex}{os.path.splitext(file.filename)[1].lower()}"
+        upload_path = os.path.join(upload_dir, upload_name)
+        _save_stream(file.stream, upload_path)
+        for encoding in _load_face_encodings(upload_path)[: MATCH_BATCH_MAX_FACES - len(queries)]:
+            queries.append(encoding)
+            sources.append(f"/events/{event_id}/uploads/{upload_name}")
+    if not queries:
+        return jsonify(error="No face found in the uploaded images."), 400
+
+    folder = request.form.get("folder", "all").strip().lower()
+    folder = _safe_folder_name(folder) if folder and folder != "all" else "all"
+    _reconcile_event_catalog(photographer_id, event_id)
+    photo_ids, photos, store = _event_match_photos(photographer_id, event_id, folder)
+    if not photos:
+        return jsonify(error="No images found in this event."), 400
+    index_dir = _event_index_dir(photographer_id, event_id)
+    photo_path = partial(_event_photo_path, photographer_id, event_id)
+    queries = np.stack(queries)
+    gallery_photos, photo_distances = _score_face_store(index_dir, store, photos, queries, photo_path)
+    if not gallery_photos:
+        return jsonify(error="No faces found in event images."), 400
+    gallery_ids = np.asarray([photo_ids[photo] for photo in gallery_photos])
+
+    people = []
+    together = np.ones(len(gallery_ids), dtype=bool)
+    for person, source in enumerate(sources):
+        distances = photo_distances[:, person]
+        compact = _ranked_matches(gallery_ids, distances, MATCH_TOP_K)
+        candidates = np.flatnonzero(np.isfinite(distances))
+        ranked = np.zeros(len(gallery_ids), dtype=bool)
+        ranked[candidates[_top_k_indices(distances[candidates], MATCH_BATCH_TOP_K)]] = True
+        together &= ranked
+        people.append(
+            {
+                "person": person,
+                "uploaded_image_url": source,
+                "matches": _expand_matches(event_id, code, compact),
+                "match_token": _store_match_cache(event_id, compact),
+            }
+        )
+    mtimes = {photo[:3]: photo[3] for photo in photos}
+    together_rows = [
+        index
+        for index in np.flatnonzero(together).tolist()
+        if _distinct_face_match(
+            _photo_face_matrix(index_dir, store, gallery_photos[index], mtimes[gallery_photos[index]], photo_path),
+            queries,
+            MATCH_TOGETHER_MAX_DISTANCE,
+        )
     ]
-    match_token = _store_match_cache(event_id, code, matches)
-    best_folder, best_name, best_is_legacy = best_match
+    compact = _ranked_matches(
+        gallery_ids, photo_distances.max(axis=1), candidates=np.asarray(together_rows, dtype=np.int64)
+    )
 
     return jsonify(
-        best_match=best_name,
-        best_folder=best_folder,
-        confidence=round(confidence, 4),
-        match_image_url=(
-            f"/events/{event_id}/photos/{best_name}?code={code}"
-            if best_is_legacy
-            else f"/events/{event_id}/folders/{best_folder}/photos/{best_name}?code={code}"
-        ),
-        uploaded_image_url=f"/events/{event_id}/uploads/{upload_name}",
-        matches=matches,
-        match_token=match_token,
+        people=people,
+        together=_expand_matches(event_id, code, compact),
+        together_token=_store_match_cache(event_id, compact),
     )
 
 
 @app.route("/events/<event_id>/matches/<token>", methods=["GET"])
 def get_match_cache(event_id, token):
-    _cleanup_match_cache()
-    entry = MATCH_CACHE.get(token)
-    if not entry or entry["event_id"] != event_id:
+    entry = _cache_get_json(f"token:{token}")
+    if not entry or entry.get("event_id") != event_id:
+        return jsonify(error="Match cache not found."), 404
+    event, _ = _find_event(event_id)
+    if not event:
         return jsonify(error="Match cache not found."), 404
     code = request.args.get("code", "")
-    if entry["code"] != code:
+    if event["code"] != code:
         return jsonify(error="Invalid access code."), 403
-    return jsonify(matches=entry["matches"])
+    return jsonify(matches=_expand_matches(event_id, code, entry["matches"]))
 
 
 @app.route("/events/<event_id>/download", methods=["POST"])
@@ -817,23 +3128,19 @@ def download_selected(event_id):
     if not items:
         return jsonify(error="No photos selected."), 400
 
-    buffer = BytesIO()
-    with zipfile.ZipFile(buffer, "w", zipfile.ZIP_DEFLATED) as archive:
-        for item in items:
-            filename = item.get("filename", "")
-            folder = item.get("folder", "default")
-            path = _resolve_event_photo_path(photographer_id, event_id, folder, filename)
-            if not path:
-                continue
-            arcname = os.path.join(folder or "default", os.path.basename(filename))
-            archive.write(path, arcname)
+    entries = []
+    for item in items:
+        filename = item.get("filename", "")
+        folder = item.get("folder", "default")
+        path = _resolve_event_photo_path(photographer_id, event_id, folder, filename)
+        if not path:
+            continue
+        entries.append((path, os.path.join(folder or "default", os.path.basename(filename))))
 
-    buffer.seek(0)
-    return send_file(
-        buffer,
+    return Response(
+        _stream_zip(entries),
         mimetype="application/zip",
-        as_attachment=True,
-        download_name=f"event-{event_id}-photos.zip",
+        headers={"Content-Disposition": f'attachment; filename="event-{event_id}-photos.zip"'},
     )
 
 
@@ -866,46 +3173,55 @@ def album_pdf(event_id):
         pdf.set_font("Helvetica", size=9)
         pdf.text(margin_x, 6, f"Event {event_id} | {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}")
 
-    for idx, item in enumerate(items, start=1):
-        if (idx - 1) % 100 == 0:
-            pdf.add_page()
-            add_header()
-
-        pos = (idx - 1) % 100
-        row = pos // cols
-        col = pos % cols
-        x = margin_x + col * cell_w
-        y = start_y + row * cell_h
-
+    thumb_dir = _event_thumb_dir(photographer_id, event_id)
+    album_items = []
+    thumb_jobs = []
+    for item in items:
         folder = _safe_folder_name(item.get("folder", "default"))
         filename = os.path.basename(item.get("filename", ""))
         photo_path = _resolve_event_photo_path(photographer_id, event_id, folder, filename)
-
+        album_items.append((folder, filename))
         if photo_path:
-            try:
-                with Image.open(photo_path) as image:
-                    image.thumbnail((300, 300))
-                    thumb_buffer = BytesIO()
-                    image.convert("RGB").save(thumb_buffer, format="JPEG")
-                    thumb_buffer.seek(0)
+            is_legacy = os.path.dirname(photo_path) == _event_photo_dir(photographer_id, event_id)
+            thumb_path = _thumbnail_path(thumb_dir, ALBUM_THUMBNAIL_SIZE, folder, filename, is_legacy)
+            thumb_jobs.append((photo_path, thumb_path))
+        else:
+            thumb_jobs.append(None)
+    with _timed("thumbnails"):
+        thumb_paths = list(_thumbnail_pool().map(_album_thumbnail, thumb_jobs))
+
+    with _timed("pdf_render"):
+        for idx, ((folder, filename), thumb_path) in enumerate(zip(album_items, thumb_paths), start=1):
+            if (idx - 1) % 100 == 0:
+                pdf.add_page()
+                add_header()
+
+            pos = (idx - 1) % 100
+            row = pos // cols
+            col = pos % cols
+            x = margin_x + col * cell_w
+            y = start_y + row * cell_h
+
+            if thumb_path:
+                try:
                     thumb_x = x + (cell_w - thumb_size) / 2
-                    pdf.image(thumb_buffer, x=thumb_x, y=y, w=thumb_size, h=thumb_size)
-            except OSError:
-                pass
-
-        pdf.set_font("Helvetica", size=6)
-        label = f"{idx}. {folder}/{filename}"
-        max_len = 18
-        if len(label) > max_len:
-            label = f"{label[:max_len - 3]}..."
-        safe_label = label.encode("latin-1", errors="ignore").decode("latin-1")
-        pdf.text(x + 1, y + thumb_size + 4, safe_label)
-
-    pdf_output = pdf.output(dest="S")
-    if isinstance(pdf_output, str):
-        pdf_bytes = pdf_output.encode("latin1")
-    else:
-        pdf_bytes = bytes(pdf_output)
+                    pdf.image(thumb_path, x=thumb_x, y=y, w=thumb_size, h=thumb_size)
+                except OSError:
+                    pass
+
+            pdf.set_font("Helvetica", size=6)
+            label = f"{idx}. {folder}/{filename}"
+            max_len = 18
+            if len(label) > max_len:
+                label = f"{label[:max_len - 3]}..."
+            safe_label = label.encode("latin-1", errors="ignore").decode("latin-1")
+            pdf.text(x + 1, y + thumb_size + 4, safe_label)
+
+        pdf_output = pdf.output(dest="S")
+        if isinstance(pdf_output, str):
+            pdf_bytes = pdf_output.encode("latin1")
+        else:
+            pdf_bytes = bytes(pdf_output)
     buffer = BytesIO(pdf_bytes)
     buffer.seek(0)
     return send_file(
@@ -917,4 +3233,14 @@ def album_pdf(event_id):
 
 
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(prog="app.py")
+    commands = parser.add_subparsers(dest="command")
+    reindex_parser = commands.add_parser(
+        "reindex", help="Reconcile event and database photos on disk with the catalog and face indexes."
+    )
+    reindex_parser.add_argument("--event", help="Only reindex this event ID.")
+    reindex_parser.add_argument("--workers", type=int, help="Encoder processes (default: CPU count).")
+    args = parser.parse_args()
+    if args.command == "reindex":
+        raise SystemExit(_reindex(args.event, args.workers))
     app.run(debug=True)
@@ -23,10 +23,23 @@ const textSelectedButton = document.getElementById("text-selected");
 const pdfSelectedButton = document.getElementById("pdf-selected");
 const clearSelectedButton = document.getElementById("clear-selected");
 
+const GALLERY_PAGE_SIZE = 60;
+const THUMBNAIL_SIZE = 320;
+const PREVIEW_SIZE = 1280;
+
 let currentEventId = null;
 let currentEventCode = null;
 let eventSelfieFile = null;
+let galleryCursor = null;
+let galleryHasMore = false;
+let galleryLoading = false;
+let galleryGeneration = 0;
 const selectedItems = new Map();
+const eventGallerySentinel = document.createElement("div");
+eventGalleryGrid.after(eventGallerySentinel);
+
+const thumbnailUrl = (url, size = THUMBNAIL_SIZE) =>
+  `${url}${url.includes("?") ? "&" : "?"}size=${size}`;
 
 const showEventStatus = (message, isError = false) => {
   eventMatchStatus.textContent = message;
@@ -101,7 +114,8 @@ const createSelectableCard = (item) => {
   });
 
   const img = document.createElement("img");
-  img.src = item.url;
+  img.src = thumbnailUrl(item.url);
+  img.loading = "lazy";
   img.alt = item.filename;
 
   const meta = document.createElement("span");
@@ -117,6 +131,12 @@ const createSelectableCard = (item) => {
   card.appendChild(checkbox);
   card.appendChild(img);
   card.appendChild(meta);
+  if (item.folders && item.folders.length > 1) {
+    const folders = document.createElement("span");
+    folders.className = "history-muted";
+    folders.textContent = `In folders: ${item.folders.join(", ")}`;
+    card.appendChild(folders);
+  }
   if (item.confidence !== undefined) {
     const confidence = document.createElement("span");
     confidence.className = "history-muted";
@@ -128,12 +148,7 @@ const createSelectableCard = (item) => {
   return card;
 };
 
-const renderEventGallery = (images) => {
-  eventGalleryGrid.innerHTML = "";
-  if (!images.length) {
-    eventGalleryGrid.innerHTML = "<p class=\"status\">No images in event.</p>";
-    return;
-  }
+const appendEventGallery = (images) => {
   images.forEach((image) => {
     const key = `${image.folder || "default"}:${image.filename}`;
     const card = createSelectableCard({
@@ -159,6 +174,7 @@ const renderEventMatches = (matches) => {
       filename: match.filename,
       folder: match.folder || "default",
       url: match.url,
+      folders: match.folders,
       confidence: match.confidence,
     });
     eventMatchesGrid.appendChild(card);
@@ -205,26 +221,73 @@ const loadEventFolders = async () => {
   }
 };
 
-const loadEventGallery = async () => {
-  if (!currentEventId || !currentEventCode) {
-    eventGalleryGrid.innerHTML = "<p class=\"status\">Enter event ID and code.</p>";
-    return;
-  }
+const galleryNeedsMore = () =>
+  galleryHasMore && eventGallerySentinel.getBoundingClientRect().top < window.innerHeight + 600;
+
+const fetchEventGalleryPage = async () => {
+  const generation = galleryGeneration;
+  galleryLoading = true;
   try {
-    const folder = eventFolderSelect.value || "all";
-    const response = await fetch(
-      `/events/${currentEventId}/photos?code=${encodeURIComponent(currentEventCode)}&folder=${encodeURIComponent(folder)}`
-    );
+    const params = new URLSearchParams({
+      code: currentEventCode,
+      folder: eventFolderSelect.value || "all",
+      limit: String(GALLERY_PAGE_SIZE),
+    });
+    if (galleryCursor) {
+      params.set("cursor", galleryCursor);
+    }
+    const response = await fetch(`/events/${currentEventId}/photos?${params}`);
     const data = await response.json();
     if (!response.ok) {
       throw new Error(data.error || "Failed to load event gallery.");
     }
-    renderEventGallery(data.images || []);
+    if (generation !== galleryGeneration) {
+      return;
+    }
+    const images = data.images || [];
+    if (!galleryCursor && !images.length) {
+      eventGalleryGrid.innerHTML = "<p class=\"status\">No images in event.</p>";
+    }
+    appendEventGallery(images);
+    galleryCursor = data.next_cursor || null;
+    galleryHasMore = Boolean(data.next_cursor);
   } catch (error) {
-    eventGalleryGrid.innerHTML = `<p class="status">${error.message}</p>`;
+    if (generation === galleryGeneration) {
+      galleryHasMore = false;
+      eventGalleryGrid.innerHTML = `<p class="status">${error.message}</p>`;
+    }
+  } finally {
+    if (generation === galleryGeneration) {
+      galleryLoading = false;
+      if (galleryNeedsMore()) {
+        fetchEventGalleryPage();
+      }
+    }
   }
 };
 
+const loadEventGallery = async () => {
+  galleryGeneration += 1;
+  galleryCursor = null;
+  galleryHasMore = false;
+  galleryLoading = false;
+  if (!currentEventId || !currentEventCode) {
+    eventGalleryGrid.innerHTML = "<p class=\"status\">Enter event ID and code.</p>";
+    return;
+  }
+  eventGalleryGrid.innerHTML = "";
+  await fetchEventGalleryPage();
+};
+
+new IntersectionObserver(
+  (entries) => {
+    if (entries.some((entry) => entry.isIntersecting) && galleryHasMore && !galleryLoading) {
+      fetchEventGalleryPage();
+    }
+  },
+  { rootMargin: "600px" }
+).observe(eventGallerySentinel);
+
 const setEventPreview = (file) => {
   const reader = new FileReader();
   reader.onload = () => {
@@ -249,6 +312,35 @@ const handleEventFile = (file) => {
   clearEventResults();
 };
 
+const readMatchStream = async (response, onEvent) => {
+  const reader = response.body.getReader();
+  const decoder = new TextDecoder();
+  let buffer = "";
+  for (;;) {
+    const { value, done } = await reader.read();
+    buffer += decoder.decode(value || new Uint8Array(), { stream: !done });
+    let boundary = buffer.indexOf("\n\n");
+    while (boundary !== -1) {
+      const frame = buffer.slice(0, boundary);
+      buffer = buffer.slice(boundary + 2);
+      let name = "message";
+      let payload = "";
+      frame.split("\n").forEach((line) => {
+        if (line.startsWith("event: ")) {
+          name = line.slice(7);
+        } else if (line.startsWith("data: ")) {
+          payload += line.slice(6);
+        }
+      });
+      onEvent(name, payload ? JSON.parse(payload) : {});
+      boundary = buffer.indexOf("\n\n");
+    }
+    if (done) {
+      return;
+    }
+  }
+};
+
 eventBrowseButton.addEventListener("click", () => eventFileInput.click());
 eventFileInput.addEventListener("change", (event) => handleEventFile(event.target.files[0]));
 
@@ -267,17 +359,32 @@ eventSearchButton.addEventListener("click", async () => {
   formData.append("folder", eventFolderSelect.value || "all");
 
   try {
-    const response = await fetch(`/events/${currentEventId}/match`, {
+    const response = await fetch(`/events/${currentEventId}/match/stream`, {
       method: "POST",
       body: formData,
     });
-    const data = await response.json();
     if (!response.ok) {
+      const data = await response.json().catch(() => ({}));
       throw new Error(data.error || "Match failed.");
     }
 
+    let data = null;
+    await readMatchStream(response, (name, payload) => {
+      if (name === "progress") {
+        renderEventMatches(payload.matches || []);
+        showEventStatus(`Searching... ${payload.scanned} photo(s) scanned.`);
+      } else if (name === "error") {
+        throw new Error(payload.error || "Match failed.");
+      } else if (name === "done") {
+        data = payload;
+      }
+    });
+    if (!data) {
+      throw new Error("Match failed.");
+    }
+
     eventUploadedImage.src = data.uploaded_image_url;
-    eventMatchedImage.src = data.match_image_url;
+    eventMatchedImage.src = thumbnailUrl(data.match_image_url, PREVIEW_SIZE);
     eventConfidence.textContent = `Confidence: ${data.confidence}`;
     eventDownload.href = data.match_image_url;
     eventDownload.classList.remove("hidden");
@@ -12,8 +12,23 @@ const refreshEventGalleryButton = document.getElementById("refresh-event-gallery
 const eventFolderInput = document.getElementById("event-folder");
 const eventGalleryFolderSelect = document.getElementById("event-gallery-folder");
 
+const GALLERY_PAGE_SIZE = 60;
+const THUMBNAIL_SIZE = 320;
+const CHUNKED_UPLOAD_THRESHOLD = 32 * 1024 * 1024;
+const UPLOAD_CHUNK_SIZE = 8 * 1024 * 1024;
+const UPLOAD_CHUNK_RETRIES = 5;
+
 let currentEventId = null;
 let currentEventCode = null;
+let galleryCursor = null;
+let galleryHasMore = false;
+let galleryLoading = false;
+let galleryGeneration = 0;
+const eventGallerySentinel = document.createElement("div");
+eventGalleryGrid.after(eventGallerySentinel);
+
+const thumbnailUrl = (url, size = THUMBNAIL_SIZE) =>
+  `${url}${url.includes("?") ? "&" : "?"}size=${size}`;
 
 const setDisabled = (disabled) => {
   createEventButton.disabled = disabled;
@@ -22,18 +37,14 @@ const setDisabled = (disabled) => {
   refreshEventGalleryButton.disabled = disabled;
 };
 
-const renderEventGallery = (images) => {
-  eventGalleryGrid.innerHTML = "";
-  if (!images.length) {
-    eventGalleryGrid.innerHTML = "<p class=\"status\">No images in event.</p>";
-    return;
-  }
+const appendEventGallery = (images) => {
   images.forEach((image) => {
     const card = document.createElement("div");
     card.className = "gallery-card";
 
     const img = document.createElement("img");
-    img.src = image.url;
+    img.src = thumbnailUrl(image.url);
+    img.loading = "lazy";
     img.alt = image.filename;
 
     const download = document.createElement("a");
@@ -81,23 +92,138 @@ const loadEventFolders = async () => {
   }
 };
 
+const galleryNeedsMore = () =>
+  galleryHasMore && eventGallerySentinel.getBoundingClientRect().top < window.innerHeight + 600;
+
+const fetchEventGalleryPage = async () => {
+  const generation = galleryGeneration;
+  galleryLoading = true;
+  try {
+    const params = new URLSearchParams({
+      code: currentEventCode,
+      folder: eventGalleryFolderSelect.value || "default",
+      limit: String(GALLERY_PAGE_SIZE),
+    });
+    if (galleryCursor) {
+      params.set("cursor", galleryCursor);
+    }
+    const response = await fetch(`/events/${currentEventId}/photos?${params}`);
+    const data = await response.json();
+    if (!response.ok) {
+      throw new Error(data.error || "Failed to load event gallery.");
+    }
+    if (generation !== galleryGeneration) {
+      return;
+    }
+    const images = data.images || [];
+    if (!galleryCursor && !images.length) {
+      eventGalleryGrid.innerHTML = "<p class=\"status\">No images in event.</p>";
+    }
+    appendEventGallery(images);
+    galleryCursor = data.next_cursor || null;
+    galleryHasMore = Boolean(data.next_cursor);
+  } catch (error) {
+    if (generation === galleryGeneration) {
+      galleryHasMore = false;
+      eventGalleryGrid.innerHTML = `<p class="status">${error.message}</p>`;
+    }
+  } finally {
+    if (generation === galleryGeneration) {
+      galleryLoading = false;
+      if (galleryNeedsMore()) {
+        fetchEventGalleryPage();
+      }
+    }
+  }
+};
+
 const loadEventGallery = async () => {
+  galleryGeneration += 1;
+  galleryCursor = null;
+  galleryHasMore = false;
+  galleryLoading = false;
   if (!currentEventId || !currentEventCode) {
     eventGalleryGrid.innerHTML = "<p class=\"status\">Enter event ID and code.</p>";
     return;
   }
+  eventGalleryGrid.innerHTML = "";
+  await fetchEventGalleryPage();
+};
+
+new IntersectionObserver(
+  (entries) => {
+    if (entries.some((entry) => entry.isIntersecting) && galleryHasMore && !galleryLoading) {
+      fetchEventGalleryPage();
+    }
+  },
+  { rootMargin: "600px" }
+).observe(eventGallerySentinel);
+
+const uploadInChunks = async (file, folder) => {
+  const sessionUrl = `/events/${currentEventId}/upload-sessions`;
+  const startResponse = await fetch(sessionUrl, {
+    method: "POST",
+    headers: { "Content-Type": "application/json" },
+    body: JSON.stringify({ filename: file.name, size: file.size, folder }),
+  });
+  const session = await startResponse.json();
+  if (!startResponse.ok) {
+    throw new Error(session.error || "Upload failed.");
+  }
+  const uploadUrl = `${sessionUrl}/${session.upload_id}`;
+  let offset = 0;
+  let retries = 0;
+  while (offset < file.size) {
+    eventStatusText.textContent = `Uploading ${file.name}: ${Math.floor((offset / file.size) * 100)}%...`;
+    try {
+      const response = await fetch(`${uploadUrl}?offset=${offset}`, {
+        method: "PUT",
+        body: file.slice(offset, offset + UPLOAD_CHUNK_SIZE),
+      });
+      const data = await response.json();
+      if (!response.ok && response.status !== 409) {
+        throw new Error(data.error || "Upload failed.");
+      }
+      offset = data.offset;
+      retries = 0;
+    } catch (error) {
+      retries += 1;
+      if (retries > UPLOAD_CHUNK_RETRIES) {
+        throw error;
+      }
+      await new Promise((resolve) => setTimeout(resolve, 1000 * retries));
+      const statusResponse = await fetch(uploadUrl).catch(() => null);
+      if (statusResponse && statusResponse.ok) {
+        offset = (await statusResponse.json()).offset;
+      }
+    }
+  }
+  eventStatusText.textContent = `Processing ${file.name}...`;
+  const response = await fetch(`${uploadUrl}/complete`, { method: "POST" });
+  const data = await response.json();
+  if (!response.ok) {
+    throw new Error(data.error || "Upload failed.");
+  }
+  return data;
+};
+
+const pollIngestJob = async (eventId, jobId) => {
   try {
-    const folder = eventGalleryFolderSelect.value || "default";
-    const response = await fetch(
-      `/events/${currentEventId}/photos?code=${encodeURIComponent(currentEventCode)}&folder=${encodeURIComponent(folder)}`
-    );
+    const response = await fetch(`/events/${eventId}/jobs/${jobId}`);
     const data = await response.json();
     if (!response.ok) {
-      throw new Error(data.error || "Failed to load event gallery.");
+      throw new Error(data.error || "Failed to load indexing status.");
+    }
+    const done = data.encoded + data.failed;
+    const failed = data.failed ? `, ${data.failed} failed` : "";
+    if (data.status === "done") {
+      eventStatusText.textContent = `Indexed ${data.encoded} of ${data.total} photo(s)${failed}.`;
+      return;
     }
-    renderEventGallery(data.images || []);
+    eventStatusText.textContent = `Indexing faces: ${done} of ${data.total} photo(s)${failed}...`;
+    setTimeout(() => pollIngestJob(eventId, jobId), 1500);
   } catch (error) {
-    eventGalleryGrid.innerHTML = `<p class="status">${error.message}</p>`;
+    eventStatusText.textContent = error.message;
   }
 };
 
@@ -184,33 +310,52 @@ uploadEventPhotoButton.addEventListener("click", async () => {
   const folder = eventFolderInput.value.trim() || "default";
   uploadEventPhotoButton.disabled = true;
   eventStatusText.textContent = "Uploading...";
-  const formData = new FormData();
-  files.forEach((file) => {
-    formData.append("files", file);
-  });
-  formData.append("folder", folder);
+  const smallFiles = files.filter((file) => file.size <= CHUNKED_UPLOAD_THRESHOLD);
+  const largeFiles = files.filter((file) => file.size > CHUNKED_UPLOAD_THRESHOLD);
   try {
-    const response = await fetch(`/events/${currentEventId}/photos/upload`, {
-      method: "POST",
-      body: formData,
-    });
-    if (response.status === 403) {
-      eventStatusText.textContent = "Login required.";
-      setDisabled(true);
-      return;
+    const results = [];
+    if (smallFiles.length) {
+      const formData = new FormData();
+      smallFiles.forEach((file) => {
+        formData.append("files", file);
+      });
+      formData.append("folder", folder);
+      const response = await fetch(`/events/${currentEventId}/photos/upload`, {
+        method: "POST",
+        body: formData,
+      });
+      if (response.status === 403) {
+        eventStatusText.textContent = "Login required.";
+        setDisabled(true);
+        return;
+      }
+      const data = await response.json();
+      if (!response.ok) {
+        throw new Error(data.error || "Upload failed.");
+      }
+      results.push(data);
     }
-    const data = await response.json();
-    if (!response.ok) {
-      throw new Error(data.error || "Upload failed.");
+    for (const file of largeFiles) {
+      results.push(await uploadInChunks(file, folder));
     }
-    if (data.saved_files && data.saved_files.length) {
-      eventStatusText.textContent = `Added ${data.saved_files.length} file(s).`;
+    const savedCount = results.reduce((total, data) => total + (data.saved_files || []).length, 0);
+    const duplicateCount = results.reduce((total, data) => total + (data.duplicates || []).length, 0);
+    if (savedCount) {
+      eventStatusText.textContent = duplicateCount
+        ? `Added ${savedCount} file(s), skipped ${duplicateCount} duplicate(s).`
+        : `Added ${savedCount} file(s).`;
+    } else if (duplicateCount) {
+      eventStatusText.textContent = `Skipped ${duplicateCount} duplicate(s).`;
     } else {
       eventStatusText.textContent = "Upload complete.";
     }
     eventPhotoInput.value = "";
     loadEventFolders();
     loadEventGallery();
+    const lastJob = results.filter((data) => data.job_id).pop();
+    if (lastJob) {
+      pollIngestJob(currentEventId, lastJob.job_id);
+    }
   } catch (error) {
     eventStatusText.textContent = error.message;
   } finally {
@@ -0,0 +1,65 @@
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import app  # noqa: E402
+
+
+def synthetic_faces(faces, people, dim, noise, rng):
+    identities = rng.random((people, dim), dtype=np.float32)
+    owners = rng.integers(0, people, size=faces)
+    vectors = identities[owners] + rng.normal(0.0, noise, size=(faces, dim)).astype(np.float32)
+    return identities, vectors
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Report IVF recall@k against brute-force search.")
+    parser.add_argument("--faces", type=int, default=20000)
+    parser.add_argument("--people", type=int, default=400)
+    parser.add_argument("--dim", type=int, default=1024)
+    parser.add_argument("--noise", type=float, default=0.15)
+    parser.add_argument("--queries", type=int, default=50)
+    parser.add_argument("--k", type=int, default=20)
+    parser.add_argument("--nprobe", type=int, nargs="+", default=[1, 2, 4, 8, 16, 32])
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(args.seed)
+    identities, vectors = synthetic_faces(args.faces, args.people, args.dim, args.noise, rng)
+    norms = app._squared_norms(vectors)
+    queries = identities[rng.integers(0, args.people, size=args.queries)]
+    queries = queries + rng.normal(0.0, args.noise, size=queries.shape).astype(np.float32)
+
+    started = time.perf_counter()
+    ivf = app._build_ivf_index(vectors, seed=args.seed)
+    print(f"built {len(ivf['centroids'])} lists over {args.faces} faces in {time.perf_counter() - started:.2f}s")
+
+    started = time.perf_counter()
+    exact = [set(app._top_k_indices(app._face_distances(vectors, q, norms), args.k).tolist()) for q in queries]
+    exact_ms = (time.perf_counter() - started) * 1000 / args.queries
+    print(f"exact: {exact_ms:.2f} ms/query")
+
+    for nprobe in args.nprobe:
+        hits = 0
+        scanned = 0
+        started = time.perf_counter()
+        for query, truth in zip(queries, exact):
+            rows = app._ivf_candidates(ivf, query, nprobe)
+            distances = app._face_distances(vectors[rows], query, norms[rows])
+            found = rows[app._top_k_indices(distances, args.k)]
+            hits += len(truth.intersection(found.tolist()))
+            scanned += len(rows)
+        elapsed_ms = (time.perf_counter() - started) * 1000 / args.queries
+        print(
+            f"nprobe={nprobe:<4d} recall@{args.k}={hits / (args.k * args.queries):.3f} "
+            f"scanned={scanned / args.queries / args.faces:.1%} {elapsed_ms:.2f} ms/query"
+        )
+
+
+if __name__ == "__main__":
+    main()
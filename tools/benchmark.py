@@ -0,0 +1,358 @@
+import argparse
+import json
+import os
+import platform
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+
+import cv2
+import numpy as np
+
+try:
+    import resource
+except ImportError:
+    resource = None
+
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+FACE_CASCADE = cv2.CascadeClassifier(os.path.join(cv2.data.haarcascades, "haarcascade_frontalface_default.xml"))
+
+
+def draw_face(person, size, rng):
+    face = np.empty((size, size, 3), dtype=np.uint8)
+    face[:] = rng.integers(0, 256, 3).tolist()
+    skin = person["skin"]
+    dark = [int(value * 0.25) for value in skin]
+    center = size // 2
+    cv2.ellipse(face, (center, center), (int(size * 0.36), int(size * 0.46)), 0, 0, 360, skin, -1)
+    eye_y = int(size * 0.42)
+    eye_x = int(size * person["eye_spacing"])
+    for side in (-1, 1):
+        brow = (center + side * eye_x, eye_y - int(size * 0.08))
+        cv2.ellipse(face, brow, (int(size * 0.1), int(size * 0.025)), 0, 0, 360, dark, -1)
+        eye = (int(size * person["eye_width"]), int(size * 0.04))
+        cv2.ellipse(face, (center + side * eye_x, eye_y), eye, 0, 0, 360, dark, -1)
+    mouth = (int(size * person["mouth_width"]), int(size * 0.04))
+    cv2.ellipse(face, (center, int(size * 0.72)), mouth, 0, 0, 360, [int(value * 0.5) for value in skin], -1)
+    nose = [int(value * 0.7) for value in skin]
+    cv2.line(face, (center, int(size * 0.45)), (center - int(size * 0.03), int(size * 0.6)), nose, max(1, size // 60))
+    return cv2.GaussianBlur(face, (0, 0), size / 80)
+
+
+def load_face_crops(faces_dir):
+    crops = []
+    for name in sorted(os.listdir(faces_dir)):
+        image = cv2.imread(os.path.join(faces_dir, name))
+        if image is not None:
+            crops.append(image)
+    if not crops:
+        raise SystemExit(f"No readable images in {faces_dir}.")
+    return crops
+
+
+def paste_face(canvas, person, crops, size, rng):
+    if crops:
+        face = cv2.resize(crops[person["crop"]], (size, size), interpolation=cv2.INTER_AREA)
+    else:
+        face = draw_face(person, size, rng)
+    height, width = canvas.shape[:2]
+    y = int(rng.integers(0, height - size))
+    x = int(rng.integers(0, width - size))
+    canvas[y : y + size, x : x + size] = face
+
+
+def synthetic_gallery(directory, args, rng):
+    crops = load_face_crops(args.faces_dir) if args.faces_dir else None
+    people = [
+        {
+            "skin": rng.integers(120, 230, 3).tolist(),
+            "eye_spacing": float(rng.uniform(0.14, 0.2)),
+            "eye_width": float(rng.uniform(0.06, 0.1)),
+            "mouth_width": float(rng.uniform(0.1, 0.18)),
+            "crop": index % len(crops) if crops else 0,
+        }
+        for index in range(args.people)
+    ]
+    width = args.size
+    height = args.size * 2 // 3
+    face_max = max(args.face_min, min(height // 2, args.face_max))
+    photos = []
+    for index in range(args.photos):
+        canvas = rng.integers(0, 256, (height, width, 3), dtype=np.uint8)
+        canvas = cv2.GaussianBlur(canvas, (0, 0), 8)
+        for person in rng.choice(len(people), int(rng.integers(1, args.faces_per_photo + 1)), replace=False):
+            paste_face(canvas, people[person], crops, int(rng.integers(args.face_min, face_max + 1)), rng)
+        path = os.path.join(directory, f"photo_{index:05d}.jpg")
+        cv2.imwrite(path, canvas, [cv2.IMWRITE_JPEG_QUALITY, 90])
+        photos.append(path)
+
+    selfies = []
+    for index in range(args.iterations):
+        canvas = np.full((640, 480, 3), 180, dtype=np.uint8)
+        canvas[:] = rng.integers(0, 256, 3).tolist()
+        for _ in range(20):
+            person = people[int(rng.integers(0, len(people)))]
+            face = draw_face(person, 280, rng) if not crops else cv2.resize(crops[person["crop"]], (280, 280))
+            canvas[180:460, 100:380] = face
+            gray = cv2.cvtColor(canvas, cv2.COLOR_BGR2GRAY)
+            if len(FACE_CASCADE.detectMultiScale(gray, scaleFactor=1.1, minNeighbors=5, minSize=(60, 60))):
+                break
+        path = os.path.join(directory, f"selfie_{index:03d}.jpg")
+        cv2.imwrite(path, canvas, [cv2.IMWRITE_JPEG_QUALITY, 92])
+        selfies.append(path)
+    return photos, selfies
+
+
+def descendant_pids(pid):
+    children = {}
+    for entry in os.listdir("/proc"):
+        if not entry.isdigit():
+            continue
+        try:
+            with open(f"/proc/{entry}/stat", encoding="utf-8") as handle:
+                parent = int(handle.read().rsplit(")", 1)[1].split()[1])
+        except (OSError, IndexError, ValueError):
+            continue
+        children.setdefault(parent, []).append(int(entry))
+    found = []
+    stack = [pid]
+    while stack:
+        for child in children.get(stack.pop(), []):
+            found.append(child)
+            stack.append(child)
+    return found
+
+
+def vm_hwm_mb(pid):
+    try:
+        with open(f"/proc/{pid}/status", encoding="utf-8") as handle:
+            for line in handle:
+                if line.startswith("VmHWM:"):
+                    return int(line.split()[1]) / 1024
+    except (OSError, ValueError):
+        pass
+    return None
+
+
+def reset_peak_rss():
+    if not os.path.exists("/proc/self/clear_refs"):
+        return
+    for pid in [os.getpid(), *descendant_pids(os.getpid())]:
+        try:
+            with open(f"/proc/{pid}/clear_refs", "w", encoding="utf-8") as handle:
+                handle.write("5")
+        except OSError:
+            pass
+
+
+def peak_rss_mb():
+    if os.path.exists("/proc/self/clear_refs"):
+        own = vm_hwm_mb(os.getpid())
+        children = [value for value in map(vm_hwm_mb, descendant_pids(os.getpid())) if value is not None]
+        return (
+            round(own, 1) if own is not None else None,
+            round(max(children), 1) if children else None,
+        )
+    if resource is None:
+        return None, None
+    scale = 1024 * 1024 if sys.platform == "darwin" else 1024
+    own = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / scale
+    children = resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss / scale
+    return round(own, 1), round(children, 1)
+
+
+def summarize(latencies, elapsed, units):
+    latencies = np.asarray(latencies, dtype=np.float64) * 1000
+    own_rss, children_rss = peak_rss_mb()
+    return {
+        "requests": len(latencies),
+        "units": units,
+        "elapsed_s": round(elapsed, 3),
+        "throughput_per_s": round(units / elapsed, 2) if elapsed else None,
+        "p50_ms": round(float(np.percentile(latencies, 50)), 2) if len(latencies) else None,
+        "p95_ms": round(float(np.percentile(latencies, 95)), 2) if len(latencies) else None,
+        "peak_rss_mb": own_rss,
+        "peak_child_rss_mb": children_rss,
+    }
+
+
+def timed(call):
+    started = time.perf_counter()
+    response = call()
+    response.get_data()
+    elapsed = time.perf_counter() - started
+    if response.status_code >= 400:
+        raise SystemExit(f"{response.request.path} failed with {response.status_code}: {response.get_data(as_text=True)}")
+    return response, elapsed
+
+
+def upload_file(path):
+    return open(path, "rb"), os.path.basename(path)
+
+
+def bench_ingest(client, event_id, photos, batch_size):
+    reset_peak_rss()
+    latencies = []
+    jobs = []
+    started = time.perf_counter()
+    for begin in range(0, len(photos), batch_size):
+        batch = photos[begin : begin + batch_size]
+        response, elapsed = timed(
+            lambda: client.post(
+                f"/events/{event_id}/photos/upload",
+                data={"folder": "bench", "files": [upload_file(path) for path in batch]},
+                content_type="multipart/form-data",
+            )
+        )
+        latencies.append(elapsed)
+        if response.get_json().get("job_id"):
+            jobs.append(response.get_json()["job_id"])
+    for job_id in jobs:
+        while client.get(f"/events/{event_id}/jobs/{job_id}").get_json().get("status") != "done":
+            time.sleep(0.05)
+    result = summarize(latencies, time.perf_counter() - started, len(photos))
+    result["unit"] = "photos"
+    return result
+
+
+def bench_match(client, event_id, code, selfies):
+    reset_peak_rss()
+    latencies = []
+    started = time.perf_counter()
+    for selfie in selfies:
+        _, elapsed = timed(
+            lambda: client.post(
+                f"/events/{event_id}/match",
+                data={"code": code, "folder": "all", "file": upload_file(selfie)},
+                content_type="multipart/form-data",
+            )
+        )
+        latencies.append(elapsed)
+    result = summarize(latencies, time.perf_counter() - started, len(selfies))
+    result["unit"] = "matches"
+    return result
+
+
+def bench_listing(client, event_id, code, page_size):
+    reset_peak_rss()
+    latencies = []
+    items = []
+    started = time.perf_counter()
+    cursor = ""
+    while True:
+        query = f"code={code}&folder=all&limit={page_size}" + (f"&cursor={cursor}" if cursor else "")
+        response, elapsed = timed(lambda: client.get(f"/events/{event_id}/photos?{query}"))
+        latencies.append(elapsed)
+        data = response.get_json()
+        items.extend({"folder": image["folder"], "filename": image["filename"]} for image in data["images"])
+        cursor = data.get("next_cursor")
+        if not cursor:
+            break
+    result = summarize(latencies, time.perf_counter() - started, len(items))
+    result["unit"] = "photos"
+    return result, items
+
+
+def bench_export(client, event_id, code, items, route, repeats):
+    reset_peak_rss()
+    latencies = []
+    total_bytes = 0
+    started = time.perf_counter()
+    for _ in range(repeats):
+        response, elapsed = timed(lambda: client.post(f"/events/{event_id}/{route}", json={"code": code, "items": items}))
+        latencies.append(elapsed)
+        total_bytes += len(response.get_data())
+    elapsed = time.perf_counter() - started
+    result = summarize(latencies, elapsed, len(items) * repeats)
+    result["unit"] = "photos"
+    result["mb_per_s"] = round(total_bytes / 1024 / 1024 / elapsed, 2) if elapsed else None
+    return result
+
+
+def git_commit():
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "HEAD"], cwd=REPO_DIR, capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark ingest, match, listing, ZIP and PDF on a synthetic event.")
+    parser.add_argument("--photos", type=int, default=200)
+    parser.add_argument("--people", type=int, default=20)
+    parser.add_argument("--faces-per-photo", type=int, default=3)
+    parser.add_argument("--size", type=int, default=1600, help="long side of generated photos in pixels")
+    parser.add_argument("--face-min", type=int, default=80)
+    parser.add_argument("--face-max", type=int, default=240)
+    parser.add_argument("--faces-dir", help="directory of face crops to paste instead of drawn faces")
+    parser.add_argument("--iterations", type=int, default=20, help="selfies to match")
+    parser.add_argument("--batch-size", type=int, default=20, help="photos per upload request")
+    parser.add_argument("--page-size", type=int, default=60)
+    parser.add_argument("--export-items", type=int, default=100)
+    parser.add_argument("--export-repeats", type=int, default=3)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--workdir", help="keep the generated event here instead of a temporary directory")
+    parser.add_argument("--output", help="write JSON results to this file instead of stdout")
+    args = parser.parse_args()
+
+    workdir = args.workdir or tempfile.mkdtemp(prefix="scnr-bench-")
+    os.makedirs(workdir, exist_ok=True)
+    shutil.copy2(os.path.join(REPO_DIR, "app.py"), workdir)
+    for name in ("templates", "static"):
+        shutil.copytree(os.path.join(REPO_DIR, name), os.path.join(workdir, name), dirs_exist_ok=True)
+    gallery_dir = os.path.join(workdir, "synthetic")
+    os.makedirs(gallery_dir, exist_ok=True)
+
+    rng = np.random.default_rng(args.seed)
+    started = time.perf_counter()
+    photos, selfies = synthetic_gallery(gallery_dir, args, rng)
+    print(f"generated {len(photos)} photos in {time.perf_counter() - started:.1f}s under {workdir}", file=sys.stderr)
+
+    sys.path.insert(0, workdir)
+    os.chdir(workdir)
+    import app  # noqa: E402
+
+    client = app.app.test_client()
+    client.post("/photographer/signup", data={"client_name": "Bench", "username": "bench", "password": "bench"})
+    event = client.post("/events", data={"name": "Benchmark"}).get_json()
+    event_id, code = event["event_id"], event["code"]
+
+    results = {}
+    results["ingest"] = bench_ingest(client, event_id, photos, args.batch_size)
+    results["match"] = bench_match(client, event_id, code, selfies)
+    results["match_cached"] = bench_match(client, event_id, code, selfies)
+    results["listing"], items = bench_listing(client, event_id, code, args.page_size)
+    export_items = items[: args.export_items]
+    results["zip"] = bench_export(client, event_id, code, export_items, "download", args.export_repeats)
+    results["pdf"] = bench_export(client, event_id, code, export_items, "album/pdf", args.export_repeats)
+
+    report = {
+        "commit": git_commit(),
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+        "config": vars(args),
+        "results": results,
+    }
+    for name, result in results.items():
+        print(
+            f"{name:<13} {result['throughput_per_s']:>9} {result['unit']}/s "
+            f"p50={result['p50_ms']}ms p95={result['p95_ms']}ms rss={result['peak_rss_mb']}MB",
+            file=sys.stderr,
+        )
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as handle:
+            json.dump(report, handle, indent=2)
+    else:
+        print(json.dumps(report, indent=2))
+    if not args.workdir:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,419 @@
+import argparse
+import asyncio
+import json
+import os
+import random
+import shutil
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+import uuid
+from urllib.parse import urlencode, urlsplit
+
+import numpy as np
+
+from benchmark import REPO_DIR, synthetic_gallery
+
+
+class HttpClient:
+    def __init__(self, host, port, stats):
+        self.host = host
+        self.port = port
+        self.stats = stats
+        self.cookies = {}
+        self.reader = None
+        self.writer = None
+
+    async def close(self):
+        if self.writer:
+            self.writer.close()
+            try:
+                await self.writer.wait_closed()
+            except OSError:
+                pass
+        self.reader = self.writer = None
+
+    async def request(self, method, path, route, body=b"", headers=None):
+        started = time.perf_counter()
+        try:
+            status, response_headers, data = await self._send(method, path, body, headers or {})
+        except (OSError, asyncio.IncompleteReadError, ValueError) as exc:
+            await self.close()
+            self.stats.record(route, time.perf_counter() - started, None, exc)
+            return None, b""
+        self.stats.record(route, time.perf_counter() - started, status, data[:200] if status >= 400 else None)
+        for name, value in response_headers:
+            if name == "set-cookie":
+                key, _, rest = value.partition("=")
+                self.cookies[key.strip()] = rest.split(";", 1)[0]
+        return status, data
+
+    async def json(self, method, path, route, payload):
+        if payload is None:
+            status, data = await self.request(method, path, route)
+        else:
+            body = json.dumps(payload).encode("utf-8")
+            status, data = await self.request(method, path, route, body, {"Content-Type": "application/json"})
+        return status, _decode_json(data)
+
+    async def form(self, path, route, fields):
+        body = urlencode(fields).encode("utf-8")
+        return await self.request("POST", path, route, body, {"Content-Type": "application/x-www-form-urlencoded"})
+
+    async def multipart(self, path, route, fields, files):
+        boundary = uuid.uuid4().hex
+        parts = []
+        for name, value in fields.items():
+            parts.append(f'--{boundary}\r\nContent-Disposition: form-data; name="{name}"\r\n\r\n{value}\r\n'.encode())
+        for name, file_path in files:
+            with open(file_path, "rb") as handle:
+                content = handle.read()
+            filename = os.path.basename(file_path)
+            parts.append(
+                f'--{boundary}\r\nContent-Disposition: form-data; name="{name}"; filename="{filename}"\r\n'
+                f"Content-Type: image/jpeg\r\n\r\n".encode()
+                + content
+                + b"\r\n"
+            )
+        parts.append(f"--{boundary}--\r\n".encode())
+        headers = {"Content-Type": f"multipart/form-data; boundary={boundary}"}
+        status, data = await self.request("POST", path, route, b"".join(parts), headers)
+        return status, _decode_json(data)
+
+    async def _send(self, method, path, body, headers):
+        reused = self.writer is not None
+        try:
+            return await self._exchange(method, path, body, headers)
+        except ConnectionError:
+            if not reused:
+                raise
+            await self.close()
+            return await self._exchange(method, path, body, headers)
+
+    async def _exchange(self, method, path, body, headers):
+        if self.writer is None:
+            self.reader, self.writer = await asyncio.open_connection(self.host, self.port)
+        lines = [f"{method} {path} HTTP/1.1", f"Host: {self.host}:{self.port}", f"Content-Length: {len(body)}"]
+        lines.extend(f"{name}: {value}" for name, value in headers.items())
+        if self.cookies:
+            lines.append("Cookie: " + "; ".join(f"{key}={value}" for key, value in self.cookies.items()))
+        self.writer.write(("\r\n".join(lines) + "\r\n\r\n").encode("latin-1") + body)
+        await self.writer.drain()
+
+        status_line = await self.reader.readline()
+        if not status_line:
+            raise ConnectionResetError("connection closed before response")
+        status = int(status_line.split()[1])
+        response_headers = []
+        while True:
+            line = (await self.reader.readline()).decode("latin-1").strip()
+            if not line:
+                break
+            name, _, value = line.partition(":")
+            response_headers.append((name.strip().lower(), value.strip()))
+        header_map = dict(response_headers)
+        if header_map.get("transfer-encoding", "").lower() == "chunked":
+            chunks = []
+            while True:
+                size = int((await self.reader.readline()).split(b";")[0], 16)
+                if size == 0:
+                    await self.reader.readline()
+                    break
+                chunks.append(await self.reader.readexactly(size))
+                await self.reader.readline()
+            data = b"".join(chunks)
+        elif "content-length" in header_map:
+            data = await self.reader.readexactly(int(header_map["content-length"]))
+        else:
+            data = await self.reader.read()
+            header_map["connection"] = "close"
+        if header_map.get("connection", "").lower() == "close":
+            await self.close()
+        return status, response_headers, data
+
+
+def _decode_json(data):
+    try:
+        return json.loads(data)
+    except ValueError:
+        return {}
+
+
+class Stats:
+    def __init__(self):
+        self.routes = {}
+        self.started = time.perf_counter()
+
+    def record(self, route, seconds, status, error):
+        entry = self.routes.setdefault(route, {"latencies": [], "errors": 0, "statuses": {}, "sample_error": None})
+        entry["latencies"].append(seconds)
+        key = str(status) if status is not None else type(error).__name__
+        entry["statuses"][key] = entry["statuses"].get(key, 0) + 1
+        if status is None or status >= 400:
+            entry["errors"] += 1
+            entry["sample_error"] = entry["sample_error"] or (
+                error.decode("utf-8", "replace") if isinstance(error, bytes) else str(error)
+            )
+
+    def report(self):
+        elapsed = time.perf_counter() - self.started
+        routes = {}
+        for route, entry in sorted(self.routes.items()):
+            latencies = np.asarray(entry["latencies"]) * 1000
+            routes[route] = {
+                "requests": len(latencies),
+                "throughput_per_s": round(len(latencies) / elapsed, 2),
+                "error_rate": round(entry["errors"] / len(latencies), 4),
+                "statuses": entry["statuses"],
+                "sample_error": entry["sample_error"],
+                "p50_ms": round(float(np.percentile(latencies, 50)), 1),
+                "p95_ms": round(float(np.percentile(latencies, 95)), 1),
+                "p99_ms": round(float(np.percentile(latencies, 99)), 1),
+                "max_ms": round(float(latencies.max()), 1),
+            }
+        total = sum(route["requests"] for route in routes.values())
+        errors = sum(entry["errors"] for entry in self.routes.values())
+        return {
+            "elapsed_s": round(elapsed, 2),
+            "requests": total,
+            "throughput_per_s": round(total / elapsed, 2) if elapsed else None,
+            "error_rate": round(errors / total, 4) if total else None,
+            "routes": routes,
+        }
+
+
+async def seed_event(host, port, photos):
+    client = HttpClient(host, port, Stats())
+    username = f"load-{uuid.uuid4().hex[:8]}"
+    await client.form("/photographer/signup", "seed", {"client_name": "Load", "username": username, "password": "load"})
+    status, data = await client.form("/events", "seed", {"name": "Loadtest"})
+    event = _decode_json(data)
+    if status != 200 or "event_id" not in event:
+        raise SystemExit(f"Could not create the event (status {status}).")
+    jobs = []
+    for begin in range(0, len(photos), 20):
+        files = [("files", path) for path in photos[begin : begin + 20]]
+        _, payload = await client.multipart(f"/events/{event['event_id']}/photos/upload", "seed", {"folder": "main"}, files)
+        if payload.get("job_id"):
+            jobs.append(payload["job_id"])
+    await wait_for_jobs(client, event["event_id"], jobs, "seed")
+    await client.close()
+    return client.cookies, event
+
+
+async def wait_for_jobs(client, event_id, jobs, route):
+    for job_id in jobs:
+        while True:
+            _, payload = await client.json("GET", f"/events/{event_id}/jobs/{job_id}", route, None)
+            if payload.get("status") in ("done", None):
+                break
+            await asyncio.sleep(0.5)
+
+
+async def guest(host, port, stats, event, selfie, args):
+    event_id, code = event["event_id"], event["code"]
+    client = HttpClient(host, port, stats)
+    await client.request("GET", f"/event/{event_id}", "GET /event/{id}")
+    await client.json("POST", f"/events/{event_id}/login", "POST /events/{id}/login", {"code": code})
+    await client.json("GET", f"/events/{event_id}/folders?code={code}", "GET /events/{id}/folders", None)
+
+    images = []
+    cursor = ""
+    for _ in range(args.pages):
+        query = {"code": code, "folder": "all", "limit": 60}
+        if cursor:
+            query["cursor"] = cursor
+        _, page = await client.json("GET", f"/events/{event_id}/photos?{urlencode(query)}", "GET /events/{id}/photos", None)
+        images.extend(page.get("images", []))
+        cursor = page.get("next_cursor")
+        if not cursor:
+            break
+
+    thumbnails = [
+        f"{image['url']}{'&' if '?' in image['url'] else '?'}size=320" for image in images[: args.thumbnails]
+    ]
+    thumbnail_clients = [HttpClient(host, port, stats) for _ in range(args.parallel)]
+
+    async def fetch_thumbnails(thumbnail_client, urls):
+        for url in urls:
+            await thumbnail_client.request("GET", url, "GET thumbnail")
+
+    await asyncio.gather(
+        *(
+            fetch_thumbnails(thumbnail_client, thumbnails[index :: args.parallel])
+            for index, thumbnail_client in enumerate(thumbnail_clients)
+        )
+    )
+
+    _, match = await client.multipart(
+        f"/events/{event_id}/match", "POST /events/{id}/match", {"code": code, "folder": "all"}, [("file", selfie)]
+    )
+    if match.get("match_token"):
+        await client.json(
+            "GET",
+            f"/events/{event_id}/matches/{match['match_token']}?code={code}",
+            "GET /events/{id}/matches/{token}",
+            None,
+        )
+    for item in [client, *thumbnail_clients]:
+        await item.close()
+
+
+async def photographer(host, port, cookies, stats, event, photos, args):
+    event_id = event["event_id"]
+    client = HttpClient(host, port, stats)
+    client.cookies = dict(cookies)
+    jobs = []
+    for batch in range(args.photographer_batches):
+        files = [("files", path) for path in photos[batch * args.batch_size : (batch + 1) * args.batch_size]]
+        _, payload = await client.multipart(
+            f"/events/{event_id}/photos/upload", "POST /events/{id}/photos/upload", {"folder": f"live{batch}"}, files
+        )
+        if payload.get("job_id"):
+            jobs.append(payload["job_id"])
+    await wait_for_jobs(client, event_id, jobs, "GET /events/{id}/jobs/{job}")
+    await client.close()
+
+
+async def run(host, port, photos, selfies, uploads, args):
+    started = time.perf_counter()
+    cookies, event = await seed_event(host, port, photos)
+    print(f"seeded {len(photos)} photos in {time.perf_counter() - started:.1f}s", file=sys.stderr)
+
+    stats = Stats()
+    limit = asyncio.Semaphore(args.concurrency or args.guests)
+
+    async def start_guest(index):
+        await asyncio.sleep(args.ramp * index / max(args.guests, 1))
+        async with limit:
+            await guest(host, port, stats, event, selfies[index % len(selfies)], args)
+
+    tasks = [start_guest(index) for index in range(args.guests)]
+    per_photographer = args.photographer_batches * args.batch_size
+    for index in range(args.photographers):
+        batches = uploads[index * per_photographer : (index + 1) * per_photographer]
+        tasks.append(photographer(host, port, cookies, stats, event, batches, args))
+    await asyncio.gather(*tasks)
+    return stats.report()
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def start_gunicorn(workdir, port, args):
+    command = [
+        sys.executable,
+        "-m",
+        "gunicorn",
+        "--workers",
+        str(args.workers),
+        "--threads",
+        str(args.threads),
+        "--bind",
+        f"127.0.0.1:{port}",
+        "--timeout",
+        "120",
+        "app:app",
+    ]
+    log = open(os.path.join(workdir, "gunicorn.log"), "wb")
+    server = subprocess.Popen(command, cwd=workdir, stdout=log, stderr=subprocess.STDOUT)
+    deadline = time.time() + 30
+    while time.time() < deadline:
+        if server.poll() is not None:
+            raise SystemExit(f"gunicorn exited early, see {log.name}")
+        try:
+            with socket.create_connection(("127.0.0.1", port), timeout=1):
+                return server
+        except OSError:
+            time.sleep(0.2)
+    server.terminate()
+    raise SystemExit("gunicorn did not start within 30s")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Simulate guests and photographers against a local gunicorn.")
+    parser.add_argument("--guests", type=int, default=300)
+    parser.add_argument("--concurrency", type=int, default=0, help="max guests in flight (default: all)")
+    parser.add_argument("--ramp", type=float, default=30.0, help="seconds over which guests arrive")
+    parser.add_argument("--pages", type=int, default=2, help="gallery pages each guest scrolls")
+    parser.add_argument("--thumbnails", type=int, default=100, help="thumbnails each guest loads")
+    parser.add_argument("--parallel", type=int, default=6, help="connections per guest for thumbnails")
+    parser.add_argument("--photographers", type=int, default=1)
+    parser.add_argument("--photographer-batches", type=int, default=3)
+    parser.add_argument("--batch-size", type=int, default=20)
+    parser.add_argument("--photos", type=int, default=300, help="photos in the seeded event")
+    parser.add_argument("--people", type=int, default=40)
+    parser.add_argument("--faces-per-photo", type=int, default=3)
+    parser.add_argument("--size", type=int, default=1600)
+    parser.add_argument("--face-min", type=int, default=80)
+    parser.add_argument("--face-max", type=int, default=240)
+    parser.add_argument("--faces-dir")
+    parser.add_argument("--selfies", type=int, default=50, help="distinct selfies shared by guests")
+    parser.add_argument("--workers", type=int, default=3, help="gunicorn workers")
+    parser.add_argument("--threads", type=int, default=1, help="gunicorn threads per worker")
+    parser.add_argument("--url", help="target an already running server instead of launching gunicorn")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--workdir")
+    parser.add_argument("--output", help="write JSON results to this file instead of stdout")
+    args = parser.parse_args()
+    args.iterations = args.selfies
+    random.seed(args.seed)
+
+    workdir = args.workdir or tempfile.mkdtemp(prefix="scnr-load-")
+    gallery_dir = os.path.join(workdir, "synthetic")
+    os.makedirs(gallery_dir, exist_ok=True)
+    photos, selfies = synthetic_gallery(gallery_dir, args, np.random.default_rng(args.seed))
+    upload_dir = os.path.join(workdir, "uploads")
+    os.makedirs(upload_dir, exist_ok=True)
+    upload_args = argparse.Namespace(**vars(args))
+    upload_args.photos = args.photographers * args.photographer_batches * args.batch_size
+    upload_args.iterations = 0
+    uploads, _ = synthetic_gallery(upload_dir, upload_args, np.random.default_rng(args.seed + 1))
+
+    server = None
+    if args.url:
+        target = urlsplit(args.url)
+        host, port = target.hostname, target.port or 80
+    else:
+        shutil.copy2(os.path.join(REPO_DIR, "app.py"), workdir)
+        for name in ("templates", "static"):
+            shutil.copytree(os.path.join(REPO_DIR, name), os.path.join(workdir, name), dirs_exist_ok=True)
+        host, port = "127.0.0.1", free_port()
+        server = start_gunicorn(workdir, port, args)
+
+    try:
+        report = asyncio.run(run(host, port, photos, selfies, uploads, args))
+    finally:
+        if server:
+            server.terminate()
+            server.wait(timeout=30)
+
+    report["config"] = {key: value for key, value in vars(args).items() if key != "iterations"}
+    print(f"{'route':<36} {'req':>6} {'req/s':>8} {'err':>7} {'p50':>8} {'p95':>8} {'p99':>8}", file=sys.stderr)
+    for route, result in report["routes"].items():
+        print(
+            f"{route:<36} {result['requests']:>6} {result['throughput_per_s']:>8} {result['error_rate']:>7.2%} "
+            f"{result['p50_ms']:>8} {result['p95_ms']:>8} {result['p99_ms']:>8}",
+            file=sys.stderr,
+        )
+    print(
+        f"total {report['requests']} requests in {report['elapsed_s']}s, "
+        f"{report['throughput_per_s']} req/s, error rate {report['error_rate']:.2%}",
+        file=sys.stderr,
+    )
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as handle:
+            json.dump(report, handle, indent=2)
+    else:
+        print(json.dumps(report, indent=2))
+    if not args.workdir:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()